@@ -0,0 +1,209 @@
+"""
+Module Name: answer_cache.py
+Description: This module provides a cache of chat answers keyed on the normalized question and the version of the data
+             folder they were answered from. It keeps the most recently used answers in memory (LRU with a time to
+             live), can keep them on disk between runs, and lets identical questions asked at the same time share one
+             request to the model. Everything cached is dropped as soon as the data version changes. Answers are only
+             cached for the first question of a conversation and for questions that don't refer back to it.
+Author: Nathaniel Thoma
+Date: 2026-10-18
+"""
+
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+import threading
+import asyncio
+import time
+import json
+import re
+import os
+
+class AnswerCache():
+
+    word_pattern = re.compile(r"\w+")
+
+    # Words that point back at the conversation ("why?", "what about its weaknesses?", "what did I just ask?"), a
+    # question with any of them can mean something else in every conversation
+    context_words = frozenset([
+        "it", "its", "they", "them", "their", "theirs", "he", "him", "his", "she", "her", "this", "that", "these",
+        "those", "one", "ones", "why", "about", "also", "else", "more", "again", "same", "other", "another", "above",
+        "previous", "earlier", "before", "last", "just", "then", "i", "me", "my", "we", "us", "our", "you", "your",
+        "yes", "no", "ok", "okay", "thanks"
+    ])
+
+    # -----------------------------------------------------------------------------------------------------------------
+    # Private Methods
+    # -----------------------------------------------------------------------------------------------------------------
+
+    def __init__(self, data_version, max_entries=256, ttl=86400, cache_path=None):
+        self.data_version = data_version
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.cache_path = Path(cache_path) if cache_path else None
+
+        self.lock = threading.Lock()
+
+        # entries[normalized question] = (answer, time it was stored), least recently used first
+        self.entries = OrderedDict()
+
+        # Questions currently being answered, {normalized question: Future of the answer}
+        self.in_flight = {}
+
+        self.hits = 0
+        self.misses = 0
+
+        self._load()
+
+    # Answers saved by an earlier run are only reused if they came from the same data
+    def _load(self):
+        if self.cache_path is None or not self.cache_path.exists():
+            return
+
+        with open(self.cache_path, 'r') as f:
+            saved = json.load(f)
+        if saved.get("data_version") != self.data_version:
+            return
+
+        now = time.time()
+        for key, (answer, stored_at) in saved.get("entries", {}).items():
+            if now - stored_at < self.ttl:
+                self.entries[key] = (answer, stored_at)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _save(self):
+        if self.cache_path is None:
+            return
+
+        tmp_path = self.cache_path.with_suffix(".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump({"data_version": self.data_version, "entries": self.entries}, f)
+        os.replace(tmp_path, self.cache_path)
+
+    # Cached answer for a normalized question, or None (call with the lock held)
+    def _lookup(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+
+        answer, stored_at = entry
+        if time.time() - stored_at >= self.ttl:
+            del self.entries[key]
+            return None
+
+        self.entries.move_to_end(key)
+        return answer
+
+    def _store(self, key, answer):
+        with self.lock:
+            self.entries[key] = (answer, time.time())
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self._save()
+
+    # -----------------------------------------------------------------------------------------------------------------
+    # Public Methods
+    # -----------------------------------------------------------------------------------------------------------------
+
+    # "What are the Banshee's evidences?" and "what are the banshee s evidences" are the same question
+    def normalize(question):
+        return " ".join(AnswerCache.word_pattern.findall(question.lower()))
+
+    # True if a question means the same thing whatever was said before it, so its answer can be shared
+    def is_standalone(question):
+        words = AnswerCache.word_pattern.findall(question.lower())
+        return len(words) > 1 and not any(word in AnswerCache.context_words for word in words)
+
+    # Cached answer for a question, or None
+    def get(self, question):
+        with self.lock:
+            return self._lookup(AnswerCache.normalize(question))
+
+    # Answer a question from the cache, or by calling compute() if it isn't cached yet
+    # If the same question is already being computed, wait for that answer instead of asking again
+    # Returns (answer, True if this call ran compute)
+    def get_or_compute(self, question, compute):
+        key = AnswerCache.normalize(question)
+
+        with self.lock:
+            answer = self._lookup(key)
+            if answer is not None:
+                self.hits += 1
+                return answer, False
+
+            pending = self.in_flight.get(key)
+            if pending is None:
+                pending = Future()
+                self.in_flight[key] = pending
+                leader = True
+            else:
+                self.hits += 1
+                leader = False
+
+        if not leader:
+            return pending.result(), False
+
+        self.misses += 1
+        try:
+            answer = compute()
+        except BaseException as error:
+            pending.set_exception(error)
+            raise
+        else:
+            self._store(key, answer)
+            pending.set_result(answer)
+            return answer, True
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+
+    # get_or_compute for the chat server, compute is a coroutine function and waiting doesn't block the event loop
+    async def get_or_compute_async(self, question, compute):
+        key = AnswerCache.normalize(question)
+
+        with self.lock:
+            answer = self._lookup(key)
+            if answer is not None:
+                self.hits += 1
+                return answer, False
+
+            pending = self.in_flight.get(key)
+            if pending is None:
+                pending = Future()
+                self.in_flight[key] = pending
+                leader = True
+            else:
+                self.hits += 1
+                leader = False
+
+        if not leader:
+            return await asyncio.wrap_future(pending), False
+
+        self.misses += 1
+        try:
+            answer = await compute()
+        except BaseException as error:
+            pending.set_exception(error)
+            raise
+        else:
+            self._store(key, answer)
+            pending.set_result(answer)
+            return answer, True
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+
+    # Drop every cached answer if the data folder changed since, e.g. a parse run by another process
+    def refresh(self, data_version):
+        if data_version != self.data_version:
+            self.invalidate(data_version)
+
+    # Drop every cached answer, e.g. after the data changed under a running process
+    def invalidate(self, data_version=None):
+        with self.lock:
+            if data_version is not None:
+                self.data_version = data_version
+            self.entries.clear()
+            self._save()
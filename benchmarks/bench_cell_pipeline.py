@@ -0,0 +1,67 @@
+"""
+Module Name: bench_cell_pipeline.py
+Description: Microbenchmark comparing the single pass cell cleaning pipeline against the old one-pass-per-rule cleanup.
+Author: Nathaniel Thoma
+Date: 2026-10-18
+
+Usage: python benchmarks/bench_cell_pipeline.py [rounds]
+"""
+
+from pathlib import Path
+import timeit
+import sys
+import re
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from general_parser import GeneralParser
+
+# Cells in the shape of the Equipment and Ghost page tables
+SAMPLE_CELLS = [
+    "Default",
+    "1.7 m/s",
+    "Line of sight ≥ 2s",
+    "Sanity ≤ 50%",
+    "[[Speed|Fast]] when the [[Ghost]] sees you",
+    "Prevents<br>hunts<br />within 3m",
+    "{{Temperature|5}}",
+    "{{Temperature|3|10}} in the [[Ghost Room|ghost room]]",
+    "[[EMF Reader]]<br>[[Spirit Box]]<br>[[Ghost Orb|Ghost Orbs]]",
+    "[[File:SpiritBox.png|link=[[Spirit Box]]]] [[Spirit Box]]",
+    "A fairly long cell with plain text only, which is what most table cells on the wiki look like.",
+]
+
+
+# The cleanup as it was before the pipeline, one full pass over the cell per rule
+def sequential_clean(cell):
+    c = re.sub(r"<br\s*/?>", ", ", cell)
+    c = re.sub(r"\[\[[^|\]]*\|([^\]]+)\]\]", r"\1", c)
+    c = re.sub(r"\[\[([^\]]+)\]\]", r"\1", c)
+    c = GeneralParser.temp_pattern.sub(GeneralParser.replace_temperature, c)
+    c = c.replace("≥", ">=").replace("≤", "<=")
+    return c
+
+
+def pipeline_clean(cell):
+    return GeneralParser.cell_pipeline.apply(cell)
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    cells = SAMPLE_CELLS * 10
+
+    # Both must clean every cell the same way before timing means anything
+    for cell in SAMPLE_CELLS:
+        assert sequential_clean(cell) == pipeline_clean(cell), cell
+
+    sequential_time = timeit.timeit(lambda: [sequential_clean(c) for c in cells], number=rounds)
+    pipeline_time = timeit.timeit(lambda: [pipeline_clean(c) for c in cells], number=rounds)
+
+    total_cells = len(cells) * rounds
+    print(f"Cells cleaned: {total_cells}")
+    print(f"Sequential: {sequential_time:.3f}s ({total_cells / sequential_time:,.0f} cells/s)")
+    print(f"Pipeline:   {pipeline_time:.3f}s ({total_cells / pipeline_time:,.0f} cells/s)")
+    print(f"Speedup:    {sequential_time / pipeline_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Module Name: bench_parsers.py
+Description: Offline benchmark suite for the parsing hot path. It runs the parser functions and every extractor end to
+             end against the recorded wikitext in benchmarks/fixtures (served by tools/fake_wiki.py), and reports
+             time, throughput and peak memory next to a stored baseline so regressions show up before a deploy.
+             Baselines are machine specific, save a fresh one before comparing on a different machine.
+Author: Nathaniel Thoma
+Date: 2026-10-18
+
+Usage: python benchmarks/bench_parsers.py [rounds] [--save-baseline] [--check]
+       --save-baseline  store these results in benchmarks/baseline.json
+       --check          exit with status 1 if anything is slower or uses more memory than the baseline allows
+"""
+
+from contextlib import redirect_stdout
+from pathlib import Path
+import statistics
+import threading
+import tracemalloc
+import tempfile
+import hashlib
+import copy
+import json
+import time
+import sys
+import io
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "tools"))
+
+from general_parser import GeneralParser
+from parser_registry import ParserRegistry
+from wiki_fetcher import get_fetcher
+import fake_wiki
+
+FIXTURES_PATH = Path(__file__).resolve().parent / "fixtures" / "wiki_pages.json"
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+
+# How much slower (or bigger) than the baseline a benchmark may get before it counts as a regression
+# Differences below the noise floors never count, timer jitter and the fake wiki's own threads show up in those
+TIME_TOLERANCE = 1.25
+MEMORY_TOLERANCE = 1.25
+TIME_NOISE_S = 0.002
+MEMORY_NOISE_KB = 64
+
+
+# Time fn over a number of rounds, then run it once more under tracemalloc for the peak memory
+# setup() runs before every round outside the timing and its result is passed to fn
+def measure(fn, rounds, setup=None):
+    times = []
+    for _ in range(rounds + 1):
+        args = setup() if setup else None
+        start = time.perf_counter()
+        fn(args)
+        times.append(time.perf_counter() - start)
+
+    # The first round warms up caches and lazy imports and isn't counted
+    times = times[1:]
+
+    args = setup() if setup else None
+    tracemalloc.start()
+    fn(args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"median_s": statistics.median(times), "min_s": min(times), "peak_kb": peak / 1024}
+
+
+# Hash of every file an extractor wrote, to spot output changes alongside speed changes
+def hash_output(output_dir):
+    digest = hashlib.sha256()
+    for file_path in sorted(Path(output_dir).iterdir()):
+        digest.update(file_path.name.encode("utf-8"))
+        digest.update(file_path.read_bytes())
+    return digest.hexdigest()
+
+
+def run_benchmarks(rounds):
+    with open(FIXTURES_PATH, 'r', encoding="utf-8") as f:
+        pages = json.load(f)["pages"]
+
+    page_texts = list(pages.values())
+    page_bytes = sum(len(text.encode("utf-8")) for text in page_texts)
+    ghost_pages = [text for text in page_texts if "{{Ghost infobox" in text]
+    unwanted = ["Notes", "References", "History", "Trivia", "Evidence", "Gallery", "See also"]
+
+    with open(ROOT / "config.json", 'r') as f:
+        config = json.load(f)
+    registry = ParserRegistry([ROOT / path for path in config["ParserModules"]], config["ParserClassName"])
+
+    results = {}
+
+    def record(name, timing, units, unit_bytes=None):
+        timing["pages"] = units
+        timing["pages_per_s"] = units / timing["median_s"]
+        if unit_bytes is not None:
+            timing["mb_per_s"] = unit_bytes / timing["median_s"] / 1e6
+        results[name] = timing
+        print(f"  {name:<40} {timing['median_s'] * 1000:9.2f} ms   {timing['pages_per_s']:9.1f} pages/s   "
+              f"peak {timing['peak_kb']:9.1f} KB")
+
+    print(f"{len(page_texts)} fixture pages, {page_bytes / 1024:.1f} KB of wikitext, {rounds} rounds each\n")
+
+    # Parser functions, straight on the fixture wikitext
+    timing = measure(lambda _: [GeneralParser.parse_tables(text) for text in page_texts], rounds)
+    record("parse_tables", timing, len(page_texts), page_bytes)
+
+    timing = measure(lambda _: [GeneralParser.parse_wiki_hierarchy(text) for text in page_texts], rounds)
+    record("parse_wiki_hierarchy", timing, len(page_texts), page_bytes)
+
+    # filter_sections prunes in place, so every round gets fresh trees
+    hierarchies = [GeneralParser.parse_wiki_hierarchy(text) for text in page_texts]
+    timing = measure(
+        lambda trees: [GeneralParser.filter_sections(tree, unwanted) for tree in trees],
+        rounds,
+        setup=lambda: copy.deepcopy(hierarchies)
+    )
+    record("filter_sections", timing, len(page_texts))
+
+    # What the extractors run: the hierarchy with the unwanted sections cut out before anything gets parsed
+    timing = measure(lambda _: [GeneralParser.parse_page(text, unwanted) for text in page_texts], rounds)
+    record("parse_page", timing, len(page_texts), page_bytes)
+
+    ghost_extractor = registry.get("parse_ghosts")["class"]
+    timing = measure(lambda _: [ghost_extractor._parse_ghost_summary(text) for text in ghost_pages], rounds)
+    record("_parse_ghost_summary", timing, len(ghost_pages))
+
+    # Every extractor end to end, fetching from the fake wiki and writing to a scratch folder
+    server = fake_wiki.make_server(0, FIXTURES_PATH)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/api.php"
+    get_fetcher(url)
+
+    try:
+        for parser_module_name in registry.names():
+            extractor = registry.get(parser_module_name)["class"]
+            with tempfile.TemporaryDirectory() as output_dir:
+
+                def extract(_):
+                    with redirect_stdout(io.StringIO()):
+                        extractor.extract_to_json(output_dir, url)
+
+                titles_before = server.state.calls["titles"]
+                extract(None)
+                titles_per_run = server.state.calls["titles"] - titles_before
+
+                timing = measure(extract, rounds)
+                timing["output_sha256"] = hash_output(output_dir)
+                record(f"{parser_module_name}.extract_to_json", timing, titles_per_run)
+    finally:
+        server.shutdown()
+
+    return results
+
+
+# Print how every benchmark compares to the baseline, returns the names of the ones that regressed
+def compare(results, baseline):
+    regressions = []
+    print("\nCompared to the baseline:")
+    for name, timing in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"  {name:<40} (not in baseline)")
+            continue
+
+        # The fastest round is the least noisy one to compare
+        time_ratio = timing["min_s"] / base["min_s"]
+        memory_ratio = timing["peak_kb"] / base["peak_kb"] if base["peak_kb"] else 1.0
+        notes = []
+        if time_ratio > TIME_TOLERANCE and timing["min_s"] - base["min_s"] > TIME_NOISE_S:
+            notes.append("SLOWER")
+        if memory_ratio > MEMORY_TOLERANCE and timing["peak_kb"] - base["peak_kb"] > MEMORY_NOISE_KB:
+            notes.append("MORE MEMORY")
+        if "output_sha256" in base and base["output_sha256"] != timing.get("output_sha256"):
+            notes.append("OUTPUT CHANGED")
+        if notes:
+            regressions.append(name)
+
+        print(f"  {name:<40} time {time_ratio:5.2f}x   memory {memory_ratio:5.2f}x   {' '.join(notes)}")
+
+    return regressions
+
+
+def main():
+    flags = [arg for arg in sys.argv[1:] if arg.startswith("--")]
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    rounds = int(args[0]) if args else 10
+
+    results = run_benchmarks(rounds)
+
+    if "--save-baseline" in flags:
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump(results, f, indent=4)
+        print(f"\nSaved baseline to {BASELINE_PATH.name}")
+        return
+
+    if not BASELINE_PATH.exists():
+        print("\nNo baseline yet, run with --save-baseline to store one")
+        return
+
+    with open(BASELINE_PATH, 'r') as f:
+        baseline = json.load(f)
+
+    regressions = compare(results, baseline)
+    if regressions and "--check" in flags:
+        print(f"\n{len(regressions)} benchmark(s) regressed: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Module Name: chat_context.py
+Description: This module keeps the conversation context sent to the model within a turn and token budget. It either
+             lets the server carry the history (previous_response_id) or keeps a sliding window of recent turns plus
+             a rolling summary of the older ones. The system prompt is always sent. Turns are kept as compact
+             (user, assistant) pairs and the whole context can be saved as a small record and loaded back later.
+Author: Nathaniel Thoma
+Date: 2026-10-18
+"""
+
+class ConversationContext():
+
+    # Rough token estimate, about 4 characters per token plus a little per message for the role markup
+    CHARS_PER_TOKEN = 4
+    TOKENS_PER_MESSAGE = 4
+
+    # -----------------------------------------------------------------------------------------------------------------
+    # Private Methods
+    # -----------------------------------------------------------------------------------------------------------------
+
+    def __init__(self, system_prompt, mode="window", max_turns=10, max_tokens=4000, summarize=None):
+        if mode not in ("window", "server"):
+            raise ValueError(f"Unknown context mode '{mode}', expected 'window' or 'server'")
+
+        self.system_prompt = system_prompt
+        self.mode = mode
+        self.max_turns = max(1, max_turns)
+        self.max_tokens = max_tokens
+
+        # summarize(previous summary, messages being dropped) -> new summary, older turns are just dropped without it
+        self.summarize = summarize
+
+        # (user message, assistant message) per turn, only turned into message dicts when a request is built
+        self.turns = []
+        self.summary = ""
+        self.previous_response_id = None
+
+    def _estimate_tokens(self, text):
+        return len(text) // self.CHARS_PER_TOKEN + self.TOKENS_PER_MESSAGE
+
+    def _window_tokens(self):
+        return sum(self._estimate_tokens(text) for turn in self.turns for text in turn)
+
+    def _turn_messages(self, turn):
+        user_input, assistant_message = turn
+        return [{"role": "user", "content": user_input}, {"role": "assistant", "content": assistant_message}]
+
+    # Once the window goes over budget, fold the oldest turns into the summary until it is down to half the budget
+    # (trimming in chunks means the summary only gets rewritten every few turns, not on every one)
+    def _trim(self):
+        if len(self.turns) <= self.max_turns and self._window_tokens() <= self.max_tokens:
+            return
+
+        dropped = []
+        while len(self.turns) > 1 and (
+            len(self.turns) > self.max_turns // 2 or self._window_tokens() > self.max_tokens // 2
+        ):
+            dropped.extend(self._turn_messages(self.turns.pop(0)))
+
+        if dropped and self.summarize is not None:
+            self.summary = self.summarize(self.summary, dropped)
+
+    # -----------------------------------------------------------------------------------------------------------------
+    # Public Methods
+    # -----------------------------------------------------------------------------------------------------------------
+
+    # Everything the next request needs besides the model and tools, as keyword arguments for responses.create
+    # reference is extra material for this question only (e.g. retrieved passages), it is not kept in the history
+    def request_args(self, user_input, reference=None):
+        user_message = {"role": "user", "content": user_input}
+        reference_messages = []
+        if reference:
+            reference_messages.append({
+                "role": "system",
+                "content": f"Reference material for this question:\n{reference}"
+            })
+
+        # The server already has the history, only the new message goes over the wire
+        if self.mode == "server":
+            args = {
+                "instructions": self.system_prompt,
+                "input": reference_messages + [user_message],
+                "truncation": "auto"
+            }
+            if self.previous_response_id:
+                args["previous_response_id"] = self.previous_response_id
+            return args
+
+        messages = [{"role": "system", "content": self.system_prompt}]
+        if self.summary:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation: {self.summary}"})
+        for turn in self.turns:
+            messages.extend(self._turn_messages(turn))
+        messages.extend(reference_messages)
+        messages.append(user_message)
+
+        return {"input": messages}
+
+    # Record a finished turn (a turn without a response id, e.g. a cached answer, leaves the server history as it was)
+    def record(self, user_input, assistant_message, response_id=None):
+        if self.mode == "server":
+            if response_id is not None:
+                self.previous_response_id = response_id
+            return
+
+        self.turns.append((user_input, assistant_message))
+        self._trim()
+
+    # Everything needed to pick the conversation up again, as a compact JSON-friendly record
+    def to_record(self):
+        return {"s": self.summary, "r": self.previous_response_id, "t": [list(turn) for turn in self.turns]}
+
+    # Pick up a conversation saved with to_record
+    def load_record(self, record):
+        self.summary = record.get("s", "")
+        self.previous_response_id = record.get("r")
+        self.turns = [tuple(turn) for turn in record.get("t", [])]
+
+    # True before the first turn, when an answer can't depend on anything said earlier
+    def is_empty(self):
+        return not self.turns and not self.summary and self.previous_response_id is None
+
+    # Rough number of bytes the conversation takes up in memory
+    def size(self):
+        return 1024 + len(self.summary) + sum(len(text) + 64 for turn in self.turns for text in turn)
+
+    # Forget everything but the system prompt
+    def reset(self):
+        self.turns = []
+        self.summary = ""
+        self.previous_response_id = None
@@ -0,0 +1,256 @@
+"""
+Module Name: chat_server.py
+Description: This module provides the asyncio chat server behind "python main.py ... --serve". Every session gets its
+             own conversation context (kept by a SessionStore), replies come from the async OpenAI client with a cap
+             on how many model calls run at once, and the vector store, answer cache and evidence index set up at
+             startup are shared by all sessions.
+
+             POST   /chat            {"session_id": optional, "message": "..."} -> {"session_id", "reply", "source"}
+             GET    /ws              WebSocket, send {"message": "..."} (or plain text) and get back
+                                     {"type": "delta", "text"} events followed by {"type": "done", "reply", "source"}
+                                     (pass ?session_id=... to continue a session)
+             DELETE /sessions/{id}   forget a session
+             GET    /health          session store and in-flight counts
+Author: Nathaniel Thoma
+Date: 2026-10-18
+"""
+
+from contextlib import asynccontextmanager
+import asyncio
+import time
+import uuid
+from aiohttp import web, WSMsgType
+from answer_cache import AnswerCache
+import metrics
+
+class ChatServer():
+
+    # -----------------------------------------------------------------------------------------------------------------
+    # Private Methods
+    # -----------------------------------------------------------------------------------------------------------------
+
+    def __init__(self, client, model, tools, sessions, answer_cache=None, data_version=None, evidence_index=None,
+                 reference=None, max_concurrency=32):
+        self.client = client
+        self.model = model
+        self.tools = tools
+
+        # SessionStore with every session's conversation context
+        self.sessions = sessions
+
+        self.answer_cache = answer_cache
+
+        # data_version() -> current version of the data folder, the answer cache is dropped whenever it changes
+        self.data_version = data_version
+
+        self.evidence_index = evidence_index
+
+        # reference(question) -> retrieved passages to send along with it, or None
+        self.reference = reference
+
+        # At most this many model calls run at once, everyone else waits their turn
+        self.model_slots = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+
+        # One turn at a time per session, turn_locks[session id] = [lock, turns waiting or running]
+        self.turn_locks = {}
+
+    # Hold a session's turn lock, the lock goes away again once nobody is waiting on it
+    @asynccontextmanager
+    async def _session_turn(self, session_id):
+        turn_lock = self.turn_locks.setdefault(session_id, [asyncio.Lock(), 0])
+        turn_lock[1] += 1
+        try:
+            async with turn_lock[0]:
+                yield
+        finally:
+            turn_lock[1] -= 1
+            if turn_lock[1] == 0:
+                del self.turn_locks[session_id]
+
+    # Ask the model, streaming text to on_text as it arrives, returns (reply, response id, usage, first token)
+    async def _ask_model(self, context, user_input, on_text, start):
+        reference = self.reference(user_input) if self.reference else None
+
+        async with self.model_slots:
+            self.in_flight += 1
+            try:
+                stream = await self.client.responses.create(
+                    model=self.model,
+                    tools=self.tools,
+                    stream=True,
+                    **context.request_args(user_input, reference)
+                )
+
+                parts = []
+                response_id = None
+                usage = None
+                first_token = None
+                async for event in stream:
+                    if event.type == "response.output_text.delta":
+                        if first_token is None:
+                            first_token = time.perf_counter() - start
+                        parts.append(event.delta)
+                        if on_text is not None:
+                            await on_text(event.delta)
+                    elif event.type == "response.completed":
+                        response_id = event.response.id
+                        usage = event.response.usage
+                    elif event.type in ("response.failed", "error"):
+                        raise RuntimeError(f"Streaming response failed: {event}")
+            finally:
+                self.in_flight -= 1
+
+        return "".join(parts), response_id, usage, first_token
+
+    # One chat turn on a checked out context, returns (reply, where it came from)
+    async def _chat_turn(self, context, user_input, on_text):
+        start = time.perf_counter()
+        response_id = None
+        usage = None
+        first_token = None
+
+        async def ask_model():
+            nonlocal response_id, usage, first_token
+            reply, response_id, usage, first_token = await self._ask_model(context, user_input, on_text, start)
+            return reply
+
+        evidence_answer = self.evidence_index.answer_question(user_input) if self.evidence_index else None
+        if evidence_answer is not None:
+            reply, source = evidence_answer, "evidence index"
+        elif self.answer_cache is None or not (context.is_empty() or AnswerCache.is_standalone(user_input)):
+            # Follow-ups depend on the session's conversation, they aren't shared through the cache
+            reply, source = await ask_model(), "model"
+        else:
+            reply, asked = await self.answer_cache.get_or_compute_async(user_input, ask_model)
+            source = "model" if asked else "cache"
+
+        # A cached or looked up answer arrives all at once
+        if source != "model" and on_text is not None:
+            first_token = time.perf_counter() - start
+            await on_text(reply)
+
+        tokens = {}
+        if usage is not None:
+            tokens = {
+                "input_tokens": usage.input_tokens,
+                "output_tokens": usage.output_tokens,
+                "total_tokens": usage.total_tokens
+            }
+        metrics.record("chat_turn", time.perf_counter() - start, source=source, **tokens)
+        if first_token is not None:
+            metrics.record("chat_first_token", first_token, source=source)
+
+        # Recording may fold old turns into the summary with a (blocking) model call, keep it off the event loop
+        await asyncio.to_thread(context.record, user_input, reply, response_id)
+
+        return reply, source
+
+    # Forget sessions that have been idle too long, drop cached answers once a parse run changed the data and write the
+    # metrics files now and then, close the store at the end
+    async def _housekeeping(self, app):
+        async def loop():
+            while True:
+                await asyncio.sleep(15)
+                await asyncio.to_thread(self.sessions.expire)
+                if self.answer_cache is not None and self.data_version is not None:
+                    self.answer_cache.refresh(await asyncio.to_thread(self.data_version))
+                await asyncio.to_thread(metrics.export)
+
+        task = asyncio.create_task(loop())
+        yield
+        task.cancel()
+        self.sessions.close()
+
+    # -----------------------------------------------------------------------------------------------------------------
+    # Public Methods
+    # -----------------------------------------------------------------------------------------------------------------
+
+    # One chat turn for a session, returns (reply, where it came from)
+    async def chat(self, session_id, user_input, on_text=None):
+        async with self._session_turn(session_id):
+            context = await asyncio.to_thread(self.sessions.check_out, session_id)
+            try:
+                return await self._chat_turn(context, user_input, on_text)
+            finally:
+                await asyncio.to_thread(self.sessions.check_in, session_id)
+
+    async def handle_chat(self, request):
+        try:
+            body = await request.json()
+        except ValueError:
+            raise web.HTTPBadRequest(text="Expected a JSON body")
+        if not isinstance(body, dict):
+            raise web.HTTPBadRequest(text="Expected a JSON object")
+
+        message = body.get("message")
+        if not isinstance(message, str) or not message.strip():
+            raise web.HTTPBadRequest(text="'message' is required")
+
+        session_id = body.get("session_id")
+        if session_id is not None and not isinstance(session_id, str):
+            raise web.HTTPBadRequest(text="'session_id' must be a string")
+        session_id = session_id or uuid.uuid4().hex
+        reply, source = await self.chat(session_id, message)
+        return web.json_response({"session_id": session_id, "reply": reply, "source": source})
+
+    async def handle_websocket(self, request):
+        socket = web.WebSocketResponse(heartbeat=30)
+        await socket.prepare(request)
+
+        session_id = request.query.get("session_id") or uuid.uuid4().hex
+        await socket.send_json({"type": "session", "session_id": session_id})
+
+        async def send_delta(text):
+            await socket.send_json({"type": "delta", "text": text})
+
+        async for message in socket:
+            if message.type != WSMsgType.TEXT:
+                continue
+
+            # {"message": "..."}, a JSON string, or anything else taken as plain text (e.g. 42 or [1] as typed)
+            try:
+                payload = message.json()
+            except ValueError:
+                payload = message.data
+            if isinstance(payload, dict):
+                user_input = payload.get("message")
+            elif isinstance(payload, str):
+                user_input = payload
+            else:
+                user_input = message.data
+            if not isinstance(user_input, str) or not user_input.strip():
+                await socket.send_json({"type": "error", "error": "'message' is required"})
+                continue
+
+            try:
+                reply, source = await self.chat(session_id, user_input, on_text=send_delta)
+            except Exception as e:
+                await socket.send_json({"type": "error", "error": str(e)})
+                continue
+            await socket.send_json({"type": "done", "reply": reply, "source": source})
+
+        return socket
+
+    async def handle_delete_session(self, request):
+        await asyncio.to_thread(self.sessions.delete, request.match_info["session_id"])
+        return web.json_response({"deleted": True})
+
+    async def handle_health(self, request):
+        stats = await asyncio.to_thread(self.sessions.stats)
+        return web.json_response({"sessions": stats, "in_flight": self.in_flight})
+
+    def make_app(self):
+        app = web.Application()
+        app.add_routes([
+            web.post("/chat", self.handle_chat),
+            web.get("/ws", self.handle_websocket),
+            web.delete("/sessions/{session_id}", self.handle_delete_session),
+            web.get("/health", self.handle_health)
+        ])
+        app.cleanup_ctx.append(self._housekeeping)
+        return app
+
+    # Serve until interrupted
+    def run(self, host="127.0.0.1", port=8080):
+        web.run_app(self.make_app(), host=host, port=port)
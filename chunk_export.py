@@ -0,0 +1,121 @@
+"""
+Module Name: chunk_export.py
+Description: This module exports the data folder as compact, section-level records for the vector store. Every
+             section becomes one small Markdown record with its breadcrumb path, entity and a stable id, long sections
+             are split to fit a token budget, and each entity gets its own file so a re-upload only touches the
+             entities that changed.
+Author: Nathaniel Thoma
+Date: 2026-10-18
+
+Usage: python chunk_export.py    (exports OutputFolder into ExportFolder and prints the size difference)
+"""
+
+from pathlib import Path
+import json
+import re
+import os
+from data_folder import iter_sections, page_label
+
+# Rough token estimate, same as the chat context uses
+CHARS_PER_TOKEN = 4
+
+slug_pattern = re.compile(r"[^a-z0-9]+")
+
+
+# File name for one entity's records, e.g. ("all_ghosts_data.json", "The Twins") -> "all_ghosts_data--the_twins.md"
+def _file_name(source, entity):
+    stem = Path(source).stem
+    if entity is None:
+        return f"{stem}.md"
+    return f"{stem}--{slug_pattern.sub('_', entity.lower()).strip('_')}.md"
+
+
+# Split text into pieces of at most max_chars, on line breaks where possible and on spaces otherwise
+def _split_text(text, max_chars):
+    pieces = []
+    current = ""
+    for line in text.split("\n"):
+        while len(line) > max_chars:
+            cut = line.rfind(" ", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(line[:cut].rstrip())
+            line = line[cut:].lstrip()
+
+        if current and len(current) + 1 + len(line) > max_chars:
+            pieces.append(current)
+            current = line
+        else:
+            current = f"{current}\n{line}" if current else line
+
+    if current.strip():
+        pieces.append(current)
+    return pieces
+
+
+# One section as one or more records that each fit in max_tokens
+def section_records(section, max_tokens=400):
+    header_chars = len(section["id"]) + len(section["path"]) + 32
+    max_chars = max(CHARS_PER_TOKEN * max_tokens - header_chars, 200)
+
+    pieces = _split_text(section["text"], max_chars)
+    records = []
+    for number, piece in enumerate(pieces, start=1):
+        record_id = section["id"] if len(pieces) == 1 else f"{section['id']}@{number}"
+        records.append({
+            "id": record_id,
+            "entity": section["entity"] or page_label(section["source"]),
+            "path": section["path"],
+            "text": piece
+        })
+    return records
+
+
+def format_record(record):
+    return f"## {record['path']}\n<!-- id: {record['id']} | entity: {record['entity']} -->\n{record['text']}\n"
+
+
+# Write every section of data_dir into export_dir as Markdown records, one file per entity
+# Files whose contents didn't change are left alone, and files for entities that are gone get removed
+# Returns {file name: number of records}
+def export_chunks(data_dir, export_dir, max_tokens=400):
+    files = {}
+    for section in iter_sections(data_dir):
+        file_name = _file_name(section["source"], section["entity"])
+        files.setdefault(file_name, []).extend(section_records(section, max_tokens))
+
+    export_path = Path(export_dir)
+    export_path.mkdir(parents=True, exist_ok=True)
+
+    for file_name, records in files.items():
+        content = "\n".join(format_record(record) for record in records)
+        file_path = export_path / file_name
+        if file_path.exists() and file_path.read_text(encoding="utf-8") == content:
+            continue
+
+        tmp_path = file_path.with_suffix(".tmp")
+        tmp_path.write_text(content, encoding="utf-8")
+        os.replace(tmp_path, file_path)
+
+    for file_path in export_path.glob("*.md"):
+        if file_path.name not in files:
+            file_path.unlink()
+
+    return {file_name: len(records) for file_name, records in files.items()}
+
+
+if __name__ == "__main__":
+    with open('config.json', 'r') as f:
+        data = json.load(f)
+
+    data_dir = Path(data.get("OutputFolder"))
+    export_dir = Path(data.get("ExportFolder", "export"))
+    exported = export_chunks(data_dir, export_dir, data.get("ExportMaxTokens", 400))
+
+    data_bytes = sum(file_path.stat().st_size for file_path in data_dir.glob("*.json*"))
+    export_bytes = sum(file_path.stat().st_size for file_path in export_dir.glob("*.md"))
+    print(f"Exported {sum(exported.values())} records into {len(exported)} files")
+    print(f"Data folder: {data_bytes:,} bytes, export: {export_bytes:,} bytes ({export_bytes / data_bytes:.0%})")
@@ -0,0 +1,139 @@
+"""
+Module Name: data_folder.py
+Description: This module provides helpers for reading the extracted data folder: flattening the section trees built by
+             GeneralParser.parse_wiki_hierarchy into one record per section, and hashing the folder's contents.
+Author: Nathaniel Thoma
+Date: 2026-10-18
+"""
+
+from pathlib import Path
+import hashlib
+from output_writer import iter_records
+
+# Keys the extractors use to name the entity a page is about
+ENTITY_KEYS = ("Ghost Name", "Equipment Name")
+
+
+# Every data file in the folder, in either output format
+def _data_files(data_dir):
+    return sorted(list(Path(data_dir).glob("*.json")) + list(Path(data_dir).glob("*.jsonl")))
+
+
+# Hash of every data file's name and contents, changes whenever a parse run changes the data
+def data_version(data_dir):
+    digest = hashlib.sha256()
+    for file_path in _data_files(data_dir):
+        digest.update(file_path.name.encode("utf-8"))
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DataVersionWatcher():
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self.stamp = None
+        self.version = None
+
+    # data_version of the folder, only hashed again once a file was added, removed, resized or modified
+    # (a stat of every file is all it costs when nothing changed)
+    def current(self):
+        stamp = [
+            (file_path.name, stat.st_size, stat.st_mtime_ns)
+            for file_path in _data_files(self.data_dir) for stat in [file_path.stat()]
+        ]
+        if stamp != self.stamp:
+            self.stamp = stamp
+            self.version = data_version(self.data_dir)
+        return self.version
+
+
+# Turn a section's content (plain text, or text plus tables) into plain text
+def content_to_text(content):
+    if isinstance(content, str):
+        return content
+
+    lines = [content.get("text", "")] if content.get("text") else []
+    for table in content.get("tables", []):
+        for row in table:
+            lines.append(", ".join(f"{header}: {value}" for header, value in row.items()))
+    return "\n".join(lines)
+
+
+# The page a single-page data file came from, e.g. "exit_door_data.json" -> "Exit Door"
+def page_label(file_name):
+    stem = Path(file_name).stem
+    if stem.endswith("_data"):
+        stem = stem[:-len("_data")]
+    return stem.replace("_", " ").title()
+
+
+def _walk_section(section, path, entity, source):
+    title = section["title"] if isinstance(section["title"], str) else ""
+    if section["level"] > 0:
+        path = path + [title]
+
+    text = content_to_text(section["content"]).strip()
+    if text:
+        yield {
+            "source": source,
+            "entity": entity,
+            "path": " > ".join(path),
+            "title": title,
+            "level": section["level"],
+            "text": text
+        }
+
+    for subsection in section["subsections"]:
+        yield from _walk_section(subsection, path, entity, source)
+
+
+def _walk(node, entity, source):
+    if isinstance(node, list):
+        for item in node:
+            yield from _walk(item, entity, source)
+        return
+
+    if not isinstance(node, dict):
+        return
+
+    for key in ENTITY_KEYS:
+        if key in node:
+            entity = node[key]
+
+    for key, value in node.items():
+        if key == "Wiki Content":
+            yield from _walk_section(value, [entity or page_label(source)], entity, source)
+        elif key == "Ghost Summary":
+            summary = "\n".join(
+                f"{name}: {', '.join(field) if isinstance(field, list) else field}"
+                for name, field in value.items() if field
+            )
+            yield {
+                "source": source,
+                "entity": entity,
+                "path": f"{entity} > Summary",
+                "title": "Summary",
+                "level": 1,
+                "text": summary
+            }
+        elif isinstance(value, (list, dict)):
+            yield from _walk(value, entity, source)
+
+
+# Every non-empty section of every data file, each with its breadcrumb path and a stable id
+def iter_sections(data_dir):
+    seen_ids = {}
+    for file_path in _data_files(data_dir):
+        for record in iter_records(file_path):
+            for section in _walk(record, None, file_path.name):
+                section_id = f"{section['source']}#{section['path']}"
+
+                # Sections with the same path in the same file get numbered
+                seen_ids[section_id] = seen_ids.get(section_id, 0) + 1
+                if seen_ids[section_id] > 1:
+                    section_id = f"{section_id}~{seen_ids[section_id]}"
+
+                yield {"id": section_id, **section}
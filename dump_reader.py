@@ -0,0 +1,183 @@
+"""
+Module Name: dump_reader.py
+Description: This module serves page wikitext from a local MediaWiki XML dump (Special:Export or a database dump,
+             uncompressed) through the same fetch_pages / fetch_page interface as the API fetcher, so every extractor
+             can rebuild the data folder offline and reproducibly. The dump is streamed once to index every page title
+             to the byte range of its <page> element, and the index is kept next to the dump for the following runs.
+             Pages are read by seeking straight to their range, so memory stays flat no matter how big the dump is.
+Author: Nathaniel Thoma
+Date: 2026-10-18
+"""
+
+import xml.etree.ElementTree as ElementTree
+import xml.parsers.expat
+from pathlib import Path
+import threading
+import json
+import os
+import metrics
+
+class DumpFetcher():
+
+    # Bytes fed to the XML parser at a time while indexing
+    CHUNK_SIZE = 1 << 20
+
+    # Redirects to follow before giving up on a title
+    MAX_REDIRECTS = 5
+
+    # -----------------------------------------------------------------------------------------------------------------
+    # Private Methods
+    # -----------------------------------------------------------------------------------------------------------------
+
+    def __init__(self, dump_path):
+        self.dump_path = Path(dump_path)
+        if not self.dump_path.exists():
+            raise FileNotFoundError(f"The dump {dump_path} does not exist")
+
+        # Named like the API fetcher's url for the messages extractors print
+        self.url = str(self.dump_path)
+
+        self.index_path = self.dump_path.with_name(self.dump_path.name + ".index.json")
+        self.lock = threading.Lock()
+        self.file = open(self.dump_path, 'rb')
+
+        # pages[title] = [start, end] byte range of its <page> element, redirects[title] = target title
+        self.pages, self.redirects = self._load_index()
+
+        # Revision id of the page each requested title was last served from, {requested title: revid}
+        self.revisions = {}
+
+    # The index saved next to the dump, as long as the dump hasn't changed since, otherwise a fresh one
+    def _load_index(self):
+        stat = self.dump_path.stat()
+        if self.index_path.exists():
+            with open(self.index_path, 'r') as f:
+                saved = json.load(f)
+            if saved.get("size") == stat.st_size and saved.get("mtime") == stat.st_mtime:
+                return saved["pages"], saved["redirects"]
+
+        with metrics.span("dump_index", bytes=stat.st_size) as span:
+            pages, redirects = self._build_index()
+            span.set("pages", len(pages))
+
+        # A dump in a read-only folder just gets indexed again next time
+        tmp_path = self.index_path.with_name(self.index_path.name + ".tmp")
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({"size": stat.st_size, "mtime": stat.st_mtime, "pages": pages, "redirects": redirects}, f)
+            os.replace(tmp_path, self.index_path)
+        except OSError:
+            pass
+
+        return pages, redirects
+
+    # Stream the whole dump once, noting where every <page> starts and ends and which pages are redirects
+    # Only the current page's title is ever held, no tree gets built
+    def _build_index(self):
+        pages = {}
+        redirects = {}
+        parser = xml.parsers.expat.ParserCreate()
+        state = {"start": None, "title": None, "in_title": False, "redirect": None}
+
+        def start_element(name, attributes):
+            if name == "page":
+                state.update(start=parser.CurrentByteIndex, title=None, redirect=None)
+            elif name == "title" and state["start"] is not None:
+                state["in_title"] = True
+                state["title"] = ""
+            elif name == "redirect" and state["start"] is not None:
+                state["redirect"] = attributes.get("title")
+
+        def end_element(name):
+            if name == "title":
+                state["in_title"] = False
+            elif name == "page" and state["start"] is not None:
+                # The end tag starts at the current byte, the range runs to just past it
+                end = parser.CurrentByteIndex + len("</page>")
+                pages[state["title"]] = [state["start"], end]
+                if state["redirect"]:
+                    redirects[state["title"]] = state["redirect"]
+                state["start"] = None
+
+        def character_data(data):
+            if state["in_title"]:
+                state["title"] += data
+
+        parser.StartElementHandler = start_element
+        parser.EndElementHandler = end_element
+        parser.CharacterDataHandler = character_data
+
+        with open(self.dump_path, 'rb') as f:
+            while True:
+                chunk = f.read(self.CHUNK_SIZE)
+                parser.Parse(chunk, not chunk)
+                if not chunk:
+                    break
+
+        return pages, redirects
+
+    # Titles the way MediaWiki stores them: underscores as spaces, the first letter upper case
+    def _normalize(self, title):
+        title = " ".join(title.replace("_", " ").split())
+        return title[:1].upper() + title[1:]
+
+    # Follow redirects until we land on a real page title, or None if there is no such page
+    def _resolve_title(self, title):
+        title = self._normalize(title)
+        for _ in range(self.MAX_REDIRECTS):
+            if title not in self.redirects:
+                break
+            title = self._normalize(self.redirects[title])
+        return title if title in self.pages else None
+
+    # Wikitext and revision id of the latest revision in a page's <page> element
+    def _read_page(self, title):
+        start, end = self.pages[title]
+        with self.lock:
+            self.file.seek(start)
+            page_xml = self.file.read(end - start)
+
+        # Namespaces are declared on the dump's root element, which the slice doesn't include
+        page = ElementTree.fromstring(page_xml)
+        revisions = page.findall("revision")
+        if not revisions:
+            return None, None
+        revid = revisions[-1].findtext("id")
+        text = revisions[-1].find("text")
+        return (text.text or "") if text is not None else None, int(revid) if revid else None
+
+    # -----------------------------------------------------------------------------------------------------------------
+    # Public Methods
+    # -----------------------------------------------------------------------------------------------------------------
+
+    # Fetch many pages at once, returns {requested title: wikitext or None if the page is missing}
+    def fetch_pages(self, titles):
+        unique_titles = list(dict.fromkeys(titles))
+
+        contents = {}
+        with metrics.span("fetch", pages=len(unique_titles), source="dump") as span:
+            for title in unique_titles:
+                page_title = self._resolve_title(title)
+                if page_title is None:
+                    contents[title] = None
+                    self.revisions[title] = None
+                    continue
+                contents[title], self.revisions[title] = self._read_page(page_title)
+                span.add("bytes", self.pages[page_title][1] - self.pages[page_title][0])
+
+        return contents
+
+    # Fetch a single page, raises KeyError if the page does not exist
+    def fetch_page(self, title):
+        content = self.fetch_pages([title])[title]
+        if content is None:
+            raise KeyError(f"Page '{title}' does not exist in {self.url}")
+        return content
+
+    # Revision id of the page a title was last fetched from, or None if it hasn't been fetched (or doesn't exist)
+    def revision(self, title):
+        return self.revisions.get(title)
+
+    def close(self):
+        with self.lock:
+            self.file.close()
@@ -0,0 +1,193 @@
+"""
+Module Name: evidence_index.py
+Description: This module provides a bitmask index of which evidence each ghost leaves, built from the Ghost Summary
+             evidence lists in all_ghosts_data.json. Every include/exclude combination is worked out up front, so
+             "which ghost has EMF 5, Ghost Orbs and Freezing" is a single lookup and never needs the model.
+Author: Nathaniel Thoma
+Date: 2026-10-18
+"""
+
+import re
+from output_writer import find_output, iter_records
+
+# Phasmophobia evidence icon file names on the wiki, and the evidence they stand for
+EVIDENCE_MAP = {
+    "EMFReader_Render": "EMF Level 5",
+    "Fingerprints_3": "Ultraviolet",
+    "ClosedBook_Render": "Ghost Writing",
+    "SpiritBox_Render": "Spirit Box",
+    "DOTTSRender": "D.O.T.S Projector",
+    "GhostOrb_Render": "Ghost Orbs",
+    "Thermometer_Render": "Freezing Temperatures"
+}
+
+# One bit per evidence type, in this order
+EVIDENCE_TYPES = list(EVIDENCE_MAP.values())
+
+# Ways players refer to each evidence type in a question
+EVIDENCE_ALIASES = {
+    "EMF Level 5": ["emf level 5", "emf 5", "emf5", "emf"],
+    "Ultraviolet": ["ultraviolet", "uv", "fingerprints", "fingerprint", "prints", "footprints"],
+    "Ghost Writing": ["ghost writing", "writing", "book"],
+    "Spirit Box": ["spirit box", "spiritbox"],
+    "D.O.T.S Projector": ["d.o.t.s projector", "d.o.t.s", "dots projector", "dots"],
+    "Ghost Orbs": ["ghost orbs", "ghost orb", "orbs", "orb"],
+    "Freezing Temperatures": ["freezing temperatures", "freezing temps", "freezing", "temps"]
+}
+
+class EvidenceIndex():
+
+    # Longest alias first, so "emf level 5" wins over "emf"
+    alias_lookup = {alias: name for name, aliases in EVIDENCE_ALIASES.items() for alias in aliases}
+    alias_pattern = re.compile(
+        r"(?<![\w.])(" + "|".join(re.escape(alias) for alias in sorted(alias_lookup, key=len, reverse=True)) + r")(?!\w)"
+    )
+
+    # Words that rule out the evidence that follows them, and words that carry that on through a list
+    negation_pattern = re.compile(r"\b(?:no|not|without|excluding|except|ruled out|rule out|isn't|doesn't|don't|nor)\b")
+    connector_pattern = re.compile(r"^(?:\s|,|and|or|nor|&)*$")
+
+    # A question about which ghost it is, checked with every evidence mention replaced by "@"
+    # Only identification phrasing counts, everything else goes to the model:
+    #   "which ghost has EMF 5, orbs and freezing?"      -> ghosts with EMF Level 5, Ghost Orbs, Freezing Temperatures
+    #   "what ghosts have no emf but orbs"                -> ghosts with Ghost Orbs, without EMF Level 5
+    #   "we found fingerprints and dots, what is it?"     -> ghosts with Ultraviolet, D.O.T.S Projector
+    #   "How do I get a ghost to leave fingerprints?"     -> None
+    #   "Which evidence does the EMF reader detect?"      -> None
+    #   "is it possible for dots to show with the lights on?" -> None
+    #   "do ghosts hunt faster in the freezing rooms?"    -> None
+    intent_pattern = re.compile(
+        r"\b(?:which|what)\s+(?:ghosts?|(?:type|kind)s? of ghosts?)\b[^.?!]*?"
+        r"\b(?:has|have|had|with|shows?|showed|gives?|gave|leaves?|left)\b[^.?!]*@"
+        r"|\b(?:we|i)(?:'ve| have)?\s+(?:have|got|found|saw)\b[^.?!]*@"
+    )
+
+    # -----------------------------------------------------------------------------------------------------------------
+    # Private Methods
+    # -----------------------------------------------------------------------------------------------------------------
+
+    def __init__(self, ghost_evidence):
+        self.bits = {name: 1 << position for position, name in enumerate(EVIDENCE_TYPES)}
+        self.all_bits = (1 << len(EVIDENCE_TYPES)) - 1
+
+        # {ghost name: evidence bitmask}, in the order the ghosts appear in the data
+        self.ghost_masks = {
+            ghost: self.mask(evidence) for ghost, evidence in ghost_evidence.items()
+        }
+        self.ghost_pattern = re.compile(
+            r"\b(?:" + "|".join(re.escape(ghost.lower()) for ghost in self.ghost_masks) + r")\b"
+        ) if self.ghost_masks else None
+
+        # matches[(include mask, exclude mask)] = ghosts that have all of include and none of exclude
+        # There are only 3^7 combinations, so every query is answered ahead of time
+        self.matches = {}
+        for include in range(self.all_bits + 1):
+            exclude = self.all_bits & ~include
+            while True:
+                self.matches[(include, exclude)] = [
+                    ghost for ghost, ghost_mask in self.ghost_masks.items()
+                    if ghost_mask & include == include and not ghost_mask & exclude
+                ]
+                if exclude == 0:
+                    break
+                exclude = (exclude - 1) & self.all_bits & ~include
+
+    # -----------------------------------------------------------------------------------------------------------------
+    # Public Methods
+    # -----------------------------------------------------------------------------------------------------------------
+
+    # Build the index from the ghost data file in the data folder
+    def load(data_dir):
+        ghosts = iter_records(find_output(data_dir, "all_ghosts_data"))
+        return EvidenceIndex({
+            ghost["Ghost Name"]: ghost.get("Ghost Summary", {}).get("Evidence", []) for ghost in ghosts
+        })
+
+    # Bitmask for a list of evidence names (names that aren't evidence types are ignored)
+    def mask(self, evidence):
+        mask = 0
+        for name in evidence:
+            mask |= self.bits.get(name, 0)
+        return mask
+
+    # Evidence names set in a bitmask
+    def names(self, mask):
+        return [name for name in EVIDENCE_TYPES if mask & self.bits[name]]
+
+    # Ghosts that have every evidence in include and none in exclude
+    def lookup(self, include=(), exclude=()):
+        include_mask = self.mask(include)
+        exclude_mask = self.mask(exclude)
+        if include_mask & exclude_mask:
+            return []
+        return self.matches[(include_mask, exclude_mask)]
+
+    # Evidence that could still turn up, given the ghosts that are left
+    def remaining_evidence(self, ghosts, include=()):
+        mask = 0
+        for ghost in ghosts:
+            mask |= self.ghost_masks[ghost]
+        return self.names(mask & ~self.mask(include))
+
+    # Pull the evidence out of a question, returns (include, exclude), or None if it isn't a ghost identification
+    # question (no evidence named, no sign it asks which ghost, or it names a ghost itself)
+    def parse_query(self, question):
+        text = question.lower()
+
+        # Look for intent and ghost names around the evidence, "ghost orbs" isn't asking which ghost it is and
+        # "spirit box" doesn't name the Spirit
+        other_words = self.alias_pattern.sub(" @ ", text)
+        if not self.intent_pattern.search(other_words):
+            return None
+        if self.ghost_pattern is not None and self.ghost_pattern.search(other_words):
+            return None
+
+        include = []
+        exclude = []
+        negated = False
+        previous_end = 0
+        for match in self.alias_pattern.finditer(text):
+            gap = text[previous_end:match.start()]
+
+            # "no EMF or orbs" rules out both, "no EMF but orbs" only the first
+            if self.negation_pattern.search(gap):
+                negated = True
+            elif previous_end == 0 or not self.connector_pattern.match(gap):
+                negated = False
+
+            name = self.alias_lookup[match.group(1)]
+            target = exclude if negated else include
+            if name not in target:
+                target.append(name)
+            previous_end = match.end()
+
+        if not include and not exclude:
+            return None
+        return include, exclude
+
+    # Plain text answer for an include/exclude query
+    def answer(self, include=(), exclude=()):
+        ghosts = self.lookup(include, exclude)
+
+        conditions = []
+        if include:
+            conditions.append("with " + ", ".join(include))
+        if exclude:
+            conditions.append("without " + ", ".join(exclude))
+        condition = " and ".join(conditions)
+
+        if not ghosts:
+            return f"No ghost matches evidence {condition}."
+
+        lines = [f"Ghosts {condition} ({len(ghosts)}): {', '.join(ghosts)}"]
+        remaining = [name for name in self.remaining_evidence(ghosts, include) if name not in exclude]
+        if len(ghosts) > 1 and remaining:
+            lines.append(f"Evidence that could still show up: {', '.join(remaining)}")
+        return "\n".join(lines)
+
+    # Answer a chat question straight from the index, or None if it isn't an evidence question
+    def answer_question(self, question):
+        query = self.parse_query(question)
+        if query is None:
+            return None
+        return self.answer(*query)
@@ -0,0 +1,182 @@
+"""
+Module Name: fetch_policy.py
+Description: This module provides the request policy the wiki fetcher sends every API call through. Each request gets
+             a timeout and the maxlag parameter. 429s, 5xx responses, maxlag, ratelimited and readonly errors and
+             dropped connections are retried with exponential backoff and jitter, or after the server's Retry-After.
+             Any other API error in a response body is raised with its code and info. The number of requests in
+             flight adapts to server feedback (AIMD): it grows by one per window of successes and halves on
+             throttling.
+Author: Nathaniel Thoma
+Date: 2026-10-18
+"""
+
+from email.utils import parsedate_to_datetime
+import threading
+import random
+import time
+import requests
+import metrics
+
+# Responses worth trying again after a pause
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Responses that mean we are going too fast, as opposed to the server just having trouble
+THROTTLE_STATUSES = {429, 503}
+
+# MediaWiki API errors (answered with a 200 and an "error" body) that mean wait and try again
+THROTTLE_ERRORS = {"maxlag", "ratelimited", "readonly"}
+
+class AdaptiveLimiter():
+
+    # -----------------------------------------------------------------------------------------------------------------
+    # Private Methods
+    # -----------------------------------------------------------------------------------------------------------------
+
+    def __init__(self, max_limit, min_limit=1):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+
+        # Every caller waits until this time (time.monotonic) after the server asked us to back off
+        self.resume_at = 0.0
+
+        self.condition = threading.Condition()
+
+    # -----------------------------------------------------------------------------------------------------------------
+    # Public Methods
+    # -----------------------------------------------------------------------------------------------------------------
+
+    # Wait for a free slot (and for any cooldown to pass)
+    def acquire(self):
+        with self.condition:
+            while True:
+                wait = self.resume_at - time.monotonic()
+                if wait > 0:
+                    self.condition.wait(wait)
+                elif self.in_flight >= int(self.limit):
+                    self.condition.wait()
+                else:
+                    self.in_flight += 1
+                    return
+
+    def release(self):
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    # Additive increase, one more slot for every full window of successful requests
+    def on_success(self):
+        with self.condition:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.condition.notify_all()
+
+    # Multiplicative decrease, and hold everyone back for delay seconds if the server said how long to wait
+    def on_throttle(self, delay=0):
+        with self.condition:
+            self.limit = max(self.min_limit, self.limit / 2)
+            if delay > 0:
+                self.resume_at = max(self.resume_at, time.monotonic() + delay)
+
+
+class FetchPolicy():
+
+    # -----------------------------------------------------------------------------------------------------------------
+    # Private Methods
+    # -----------------------------------------------------------------------------------------------------------------
+
+    def __init__(self, max_concurrency=8, max_retries=5, timeout=30, maxlag=5, base_delay=0.5, max_delay=60):
+        self.limiter = AdaptiveLimiter(max_concurrency)
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.maxlag = maxlag
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    # Seconds the server asked us to wait, from a Retry-After header (seconds or an HTTP date)
+    def _retry_after(self, response):
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    # Full jitter: anywhere between nothing and the exponential backoff for this attempt
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    # The JSON body of a response, or None when it isn't JSON
+    def _json(self, response):
+        try:
+            return response.json()
+        except ValueError:
+            return None
+
+    # -----------------------------------------------------------------------------------------------------------------
+    # Public Methods
+    # -----------------------------------------------------------------------------------------------------------------
+
+    # GET an API url and return (response, parsed JSON), retrying whatever is worth retrying
+    def get(self, session, url, params):
+        if self.maxlag is not None:
+            params = {**params, "maxlag": self.maxlag}
+
+        span = metrics.current_span()
+        attempt = 0
+        while True:
+            self.limiter.acquire()
+            try:
+                response = session.get(url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as error:
+                failure = error
+                response = None
+            finally:
+                self.limiter.release()
+
+            body = None
+            retry_after = None
+            throttled = False
+            if response is not None:
+                body = self._json(response)
+                retry_after = self._retry_after(response)
+
+                # The wiki reports its errors with a 200 and an error body, e.g. replication lag over our maxlag
+                error = body.get("error") if isinstance(body, dict) else None
+                error_code = (error.get("code") if isinstance(error, dict) else str(error)) if error else None
+                lagged = error_code in THROTTLE_ERRORS
+                throttled = lagged or response.status_code in THROTTLE_STATUSES
+
+                if response.status_code not in RETRY_STATUSES and not lagged:
+                    response.raise_for_status()
+                    if body is None:
+                        raise ValueError(f"Expected JSON from {url}, got '{response.text[:100]}'")
+                    if error_code is not None:
+                        info = error.get("info", "") if isinstance(error, dict) else ""
+                        raise RuntimeError(f"The wiki API at {url} answered with error '{error_code}': {info}")
+                    self.limiter.on_success()
+                    return response, body
+
+                failure = f"HTTP {response.status_code}" + (f" ({error_code})" if lagged else "")
+
+            if throttled:
+                self.limiter.on_throttle(retry_after or 0)
+            if span is not None:
+                span.add("retries")
+                if throttled:
+                    span.add("throttled")
+
+            if attempt >= self.max_retries:
+                if isinstance(failure, Exception):
+                    raise failure
+                response.raise_for_status()
+                raise RuntimeError(f"Giving up on {url} after {attempt + 1} attempts: {failure}")
+
+            delay = retry_after if retry_after is not None else self._backoff(attempt)
+            time.sleep(min(delay, self.max_delay))
+            attempt += 1
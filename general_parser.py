@@ -1,6 +1,118 @@
 import mwparserfromhell
+from mwparserfromhell.nodes import Text
+from mwparserfromhell.smart_list import SmartList
+from mwparserfromhell.wikicode import Wikicode
 import re
 
+class TransformPipeline:
+    """
+    A set of find/replace rules that are combined into one alternation regex,
+    so a string only gets scanned once no matter how many rules are registered.
+    Where rules could match at the same spot, the one registered first wins.
+    """
+
+    # Gives a rule's replacement function the groups of its own pattern out of the combined match
+    class RuleMatch:
+        __slots__ = ("match", "offset")
+
+        def __init__(self, match, offset):
+            self.match = match
+            self.offset = offset
+
+        def group(self, index=0):
+            return self.match.group(self.offset + index)
+
+
+    backref_pattern = re.compile(r"\\(\d+)|\\g<(\d+)>")
+
+
+    def __init__(self):
+        self._rules = []
+        self._regex = None
+        self._actions = {}
+        self._sequential_marker = None
+
+
+    # Add a rule, replacement is either a string (backreferences allowed) or a function taking the match
+    # If reapply is set the rules get run again over the replaced text (e.g. the display text of a link)
+    def register(self, pattern, replacement, reapply=False):
+        self._rules.append((re.compile(pattern), replacement, reapply))
+        self._regex = None
+
+
+    # Text whose single pass result still contains marker gets the rules applied again from the start, one full pass
+    # at a time in the order they were registered, for input where one pass can't give the same result (e.g. a link
+    # nested in a link's display text, which the rule by rule cleanup unwraps from the outside in)
+    def apply_sequentially_if(self, marker):
+        self._sequential_marker = marker
+
+
+    def _apply_sequential(self, text):
+        for rule_regex, replacement, reapply in self._rules:
+            if callable(replacement):
+                text = rule_regex.sub(lambda m: replacement(TransformPipeline.RuleMatch(m, 0)), text)
+            else:
+                text = rule_regex.sub(replacement, text)
+        return text
+
+
+    def _compile(self):
+        alternatives = []
+        self._actions = {}
+
+        # Each rule becomes one group, its own groups are numbered right after it
+        offset = 1
+        for rule_regex, replacement, reapply in self._rules:
+            alternatives.append(f"({rule_regex.pattern})")
+
+            # Point string backreferences at the rule's groups inside the combined regex
+            # A replacement that is just one backreference turns into a plain group lookup
+            if isinstance(replacement, str):
+                single_ref = self.backref_pattern.fullmatch(replacement)
+                if single_ref:
+                    replacement = offset + int(single_ref.group(1) or single_ref.group(2))
+                else:
+                    replacement = self.backref_pattern.sub(
+                        lambda m: f"\\g<{offset + int(m.group(1) or m.group(2))}>", replacement
+                    )
+
+            self._actions[offset] = (replacement, offset, reapply)
+            offset += rule_regex.groups + 1
+
+        self._regex = re.compile("|".join(alternatives))
+
+
+    # Called once per match, hands the match to the rule that produced it
+    def _dispatch(self, match):
+        # The rule's own group is the outermost one, so it is always the last one closed
+        replacement, offset, reapply = self._actions[match.lastindex]
+
+        if isinstance(replacement, int):
+            result = match.group(replacement)
+        elif callable(replacement):
+            result = replacement(TransformPipeline.RuleMatch(match, offset))
+        elif "\\" in replacement:
+            result = match.expand(replacement)
+        else:
+            result = replacement
+
+        if reapply:
+            return self._regex.sub(self._dispatch, result)
+        return result
+
+
+    def apply(self, text):
+        if self._regex is None:
+            self._compile()
+        result = self._regex.sub(self._dispatch, text)
+
+        # The marker can only be left behind if the text had it to begin with, most text skips the second check
+        marker = self._sequential_marker
+        if marker is not None and marker in text and marker in result:
+            return self._apply_sequential(text)
+        return result
+
+
 class GeneralParser:
 
     def __init__(self):
@@ -25,17 +137,35 @@ class GeneralParser:
             f2 = c_to_f(t2)
             return f"{t1}-{t2}C ({f1:.1f}-{f2:.0f}F)"
 
+
+    # Cleanup rules for table cells, all applied in a single pass over each cell
+    cell_pipeline = TransformPipeline()
+    cell_pipeline.register(r"<br\s*/?>", ", ")                                # <br>, <br/>, or <br > -> comma
+    cell_pipeline.register(r"\[\[[^|\]]*\|([^\]]+)\]\]", r"\1", reapply=True)  # [[Link|Display]] -> Display
+    cell_pipeline.register(r"\[\[([^\]]+)\]\]", r"\1", reapply=True)           # [[Display]] -> Display
+    cell_pipeline.register(temp_pattern.pattern, replace_temperature)         # {{Temperature|5}} -> 5C (41F)
+    cell_pipeline.register("≥", ">=")
+    cell_pipeline.register("≤", "<=")
+    cell_pipeline.apply_sequentially_if("[[")            # [[File:X|link=[[Spirit Box]]]] left a link behind
+
     
     def parse_tables(text):
         """
         Parses Wikitext tables into a structured list of dictionaries.
         Each table includes its caption (if any) and a list of rows/cells.
+        Accepts raw wikitext or already parsed Wikicode.
         """
-        parsed = mwparserfromhell.parse(text)
+        parsed = mwparserfromhell.parse(text) if isinstance(text, str) else text
+        return GeneralParser._parse_table_nodes(
+            parsed.filter_tags(matches=lambda node: node.tag == "table")
+        )
+
+
+    def _parse_table_nodes(table_nodes):
         tables_data = []
 
-        # Find all table tags in the wikicode
-        for table in parsed.filter_tags(matches=lambda node: node.tag == "table"):
+        # Go through every table tag in the wikicode
+        for table in table_nodes:
             table_str = str(table.contents)
 
             # Extract the headers (sometimes people do it weird so i've set it up for 2 cases)
@@ -59,13 +189,7 @@ class GeneralParser:
                 # Clean the cell data
                 cleaned_cells = []
                 for cell in cells:
-                    c = re.sub(r"<br\s*/?>", ", ", cell)                # <br>, <br/>, or <br > -> comma
-                    c = re.sub(r"\[\[[^|\]]*\|([^\]]+)\]\]", r"\1", c)  # [[Link|Display]] -> Display
-                    c = re.sub(r"\[\[([^\]]+)\]\]", r"\1", c)           # [[Display]] -> Display
-                    c = GeneralParser.temp_pattern.sub(GeneralParser.replace_temperature, c)
-                    c = c.replace("≥", ">=").replace("≤", "<=")
-
-
+                    c = GeneralParser.cell_pipeline.apply(cell)
                     cleaned_cells.append(c.strip())
 
                 # Zip headers with cleaned cells into a dictionary
@@ -79,78 +203,207 @@ class GeneralParser:
         return tables_data
     
 
-    # Parse the wiki content into a hierarchical structure
-    def parse_wiki_hierarchy(raw_text):
-        header_regex = r"^(={1,6})\s*(.*?)\s*\1\s*$"
-        tokens = re.split(header_regex, raw_text, flags=re.MULTILINE)
-        
-        def clean_text(text):
-            if not text:
-                return {"text": "", "tables": []}
-            
-            # 1. Extract structured table data
-            tables = GeneralParser.parse_tables(text)
-            
-            # 2. Get clean text (stripping tables and markup)
-            parsed = mwparserfromhell.parse(text)
-            for table in parsed.filter_tags(matches=lambda node: node.tag == "table"):
-                try:
-                    parsed.remove(table)
-                except ValueError:
-                    # This triggers if the table was already removed
-                    pass
-                
-            if (tables is None) or (len(tables) == 0):
-                return str(parsed.strip_code()).strip()
+    # Titles without any of these characters can't contain markup, so they don't need parsing
+    markup_chars = re.compile(r"[\[\]{}<>&':;=*#-]")
+    # Markup left behind as plain text means the page is malformed somewhere (e.g. an unclosed table), and the
+    # tokenizer may have backtracked across section boundaries, so those pages get parsed section by section
+    unparsed_markup = re.compile(r"\{\{|\{\||\[\[|<")
+    header_regex = re.compile(r"^(={1,6})\s*(.*?)\s*\1\s*$", re.MULTILINE)
+
+
+    # Turn parsed wikicode into clean text plus any tables it contains
+    def clean_wikicode(parsed, is_empty=False):
+        if is_empty:
+            return {"text": "", "tables": []}
+
+        # 1. Extract structured table data
+        table_nodes = parsed.filter_tags(matches=lambda node: node.tag == "table")
+        tables = GeneralParser._parse_table_nodes(table_nodes)
+
+        # 2. Get clean text (stripping tables and markup) from the same parse
+        for table in table_nodes:
+            try:
+                parsed.remove(table)
+            except ValueError:
+                # This triggers if the table was already removed
+                pass
+
+        if (tables is None) or (len(tables) == 0):
+            return str(parsed.strip_code()).strip()
+        else:
+            return {
+                "text": str(parsed.strip_code()).strip(),
+                "tables": tables
+            }
+
+
+    # Clean a raw piece of wikitext on its own (used for titles and anything that can't reuse the page parse)
+    def clean_text(text):
+        if not text:
+            return {"text": "", "tables": []}
+
+        # Plain titles come out of strip_code unchanged
+        if "\n" not in text and not GeneralParser.markup_chars.search(text):
+            return text.strip()
+
+        return GeneralParser.clean_wikicode(mwparserfromhell.parse(text))
+
+
+    # Split the nodes of a parsed page into the body of each section
+    # Returns one node list per body, or None for bodies a node straddles into (those get parsed on their own)
+    def _split_bodies(parsed, spans):
+        bodies = [SmartList() for _ in spans]
+        broken = set()
+
+        span_index = 0
+        offset = 0
+        for node in parsed.nodes:
+            node_text = str(node)
+            start = offset
+            end = offset + len(node_text)
+            offset = end
+
+            if start == end:
+                continue
+
+            # Skip bodies that end before this node starts
+            while span_index < len(spans) - 1 and spans[span_index][1] <= start:
+                span_index += 1
+
+            # Every body this node overlaps
+            touched = []
+            i = span_index
+            while i < len(spans) and spans[i][0] < end:
+                if spans[i][1] > start:
+                    touched.append(i)
+                i += 1
+
+            if isinstance(node, Text):
+                # Text can be cut at any character, keep only the parts inside each body
+                for i in touched:
+                    cut_start = max(start, spans[i][0]) - start
+                    cut_end = min(end, spans[i][1]) - start
+                    bodies[i].append(Text(node_text[cut_start:cut_end]))
+            elif len(touched) == 1 and spans[touched[0]][0] <= start and end <= spans[touched[0]][1]:
+                bodies[touched[0]].append(node)
             else:
-                return {
-                    "text": str(parsed.strip_code()).strip(),
-                    "tables": tables
-                }
+                # The node crosses a header boundary, so the regex split and the parse tree disagree here
+                broken.update(touched)
+
+        return [None if i in broken else body for i, body in enumerate(bodies)]
+
+
+    # An empty header cleans up to an empty text dict rather than a string, that never matches anything
+    def _is_excluded(title, exclude):
+        return isinstance(title, str) and title.lower() in exclude
+
+
+    # Which headers survive the exclude list, as {header number (from 1): cleaned title}
+    # An excluded header takes every deeper header after it along (its subsections), those titles never get cleaned
+    def _kept_headers(headers, exclude):
+        kept = {}
+        excluded_level = None
+        for i, match in enumerate(headers, start=1):
+            level = len(match.group(1))
+            if excluded_level is not None:
+                if level > excluded_level:
+                    continue
+                excluded_level = None
+
+            title = GeneralParser.clean_text(match.group(2))
+            if exclude and GeneralParser._is_excluded(title, exclude):
+                excluded_level = level
+                continue
+            kept[i] = title
+        return kept
 
-        # The first token is always the "root" content before any headers
+
+    # Parse the wiki content into a hierarchical structure, leaving out sections titled in exclude (and everything
+    # under them) the same way filter_sections would
+    # The page is parsed once, each section body reuses the nodes of that parse. Excluded sections are cut out of
+    # the text before it gets parsed, so none of their markup is ever processed
+    def parse_wiki_hierarchy(raw_text, exclude=None):
+        exclude = {item.lower() for item in exclude} if exclude else None
+        headers = list(GeneralParser.header_regex.finditer(raw_text))
+        titles = GeneralParser._kept_headers(headers, exclude)
+
+        # Body spans: before the first header, then after each kept header up to the next header
+        starts = [0] + [match.end() for match in headers]
+        ends = [match.start() for match in headers] + [len(raw_text)]
+        kept = [0] + list(titles)
+
+        if len(kept) == len(starts):
+            text = raw_text
+            spans = list(zip(starts, ends))
+        else:
+            # Keep each surviving header with its body and shift the body spans to where they land in the cut text
+            pieces = []
+            spans = []
+            length = 0
+            for i in kept:
+                piece_start = headers[i - 1].start() if i else 0
+                pieces.append(raw_text[piece_start:ends[i]])
+                shift = length - piece_start
+                spans.append((starts[i] + shift, ends[i] + shift))
+                length += ends[i] - piece_start
+            text = "".join(pieces)
+
+        parsed = mwparserfromhell.parse(text)
+        if any(isinstance(node, Text) and GeneralParser.unparsed_markup.search(node.value) for node in parsed.nodes):
+            bodies = [None] * len(spans)
+        else:
+            bodies = GeneralParser._split_bodies(parsed, spans)
+
+        def clean_body(body_index):
+            start, end = spans[body_index]
+            if bodies[body_index] is None:
+                return GeneralParser.clean_text(text[start:end])
+            return GeneralParser.clean_wikicode(Wikicode(bodies[body_index]), is_empty=(start == end))
+
+        # The first body is always the "root" content before any headers
         root = {
             "title": "Root",
             "level": 0,
-            "content": clean_text(tokens[0]),
+            "content": clean_body(0),
             "subsections": []
         }
         stack = [root]
 
-        # Iterate through matches (each match is: level_markup, title, content)
-        for i in range(1, len(tokens), 3):
-            level = len(tokens[i])      # Count of '='
-            title = clean_text(tokens[i+1])
-            content = clean_text(tokens[i+2])
-            
+        # Iterate through the kept headers (each one has a level markup, a title and the body that follows it)
+        for body_index, i in enumerate(kept[1:], start=1):
+            level = len(headers[i - 1].group(1))      # Count of '='
+            content = clean_body(body_index)
+
             new_section = {
-                "title": title,
+                "title": titles[i],
                 "level": level,
                 "content": content,
                 "subsections": []
             }
-            
+
             while stack and stack[-1]["level"] >= level:
                 stack.pop()
-            
+
             stack[-1]["subsections"].append(new_section)
             stack.append(new_section)
 
         return root
-    
-    
-    # Filter out unwanted sections
-    def filter_sections(section, exclude_list):
-        exclude_list = [item.lower() for item in exclude_list]
-        
-        # Filter the subsections first (bottom-up approach)
+
+
+    def _filter_subsections(section, exclude):
         section["subsections"] = [
-            GeneralParser.filter_sections(sub, exclude_list) 
-            for sub in section["subsections"] 
-            if sub["title"].lower() not in exclude_list
+            GeneralParser._filter_subsections(sub, exclude)
+            for sub in section["subsections"]
+            if not GeneralParser._is_excluded(sub["title"], exclude)
         ]
-        
-        # Remove None values (if any) and return the cleaned section
-        section["subsections"] = [s for s in section["subsections"] if s is not None]
-        
-        return section
\ No newline at end of file
+        return section
+
+
+    # Filter out unwanted sections from an already parsed hierarchy
+    # (parse_wiki_hierarchy(raw_text, exclude) does the same without parsing them in the first place)
+    def filter_sections(section, exclude_list):
+        return GeneralParser._filter_subsections(section, {item.lower() for item in exclude_list})
+
+    # Parse a page into its hierarchy without the unwanted sections (what every extractor does with a page)
+    def parse_page(raw_text, unwanted=None):
+        return GeneralParser.parse_wiki_hierarchy(raw_text, unwanted)
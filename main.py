@@ -5,19 +5,22 @@ Author: Nathaniel Thoma
 Date: 2025-12-19
 """
 
+import atexit
 import json
 import sys
-import importlib.util
-from pathlib import Path
-from openai import OpenAI
+import time
+from parser_registry import ParserRegistry
+import metrics
+
+# Import timings of the startup path, printed with --startup-profile
+startup_start = time.perf_counter()
+startup_times = []
 
 # ---------------------------------------------------------------------------------------------------------------------
 # Initializes the parsing
 # ---------------------------------------------------------------------------------------------------------------------
 
-# Dynamically find all parsers given in config.json
-
-parsers = []
+# Register all parsers given in config.json (they only get imported once they are used)
 
 with open('config.json', 'r') as f:
     data = json.load(f)
@@ -28,138 +31,353 @@ class_name = data.get("ParserClassName")
 if not file_paths or not class_name:
     raise ValueError("config.json is missing ParserModules[] or ParserClass Name")
 
-for file_path in file_paths:
-    parser_path = Path(file_path).resolve()
-
-    if not parser_path:
-        raise FileNotFoundError(f"The file {file_path} does not exist")
-    print(f"Found file {file_path}")
-
-    parser_module_name = parser_path.stem
+registry = ParserRegistry(file_paths, class_name)
 
-    parser_spec = importlib.util.spec_from_file_location(parser_module_name, file_path)
-    if not parser_spec:
-        raise ImportError(f"Could not import module specification for {file_path}")
-    
-    parser_module = importlib.util.module_from_spec(parser_spec)
-    sys.modules[parser_module_name] = parser_module
-    parser_spec.loader.exec_module(parser_module)
-
-    try:
-        parser_class = getattr(parser_module, class_name)
-        parsers.append({"class": parser_class(), "name": parser_module_name})
-    except AttributeError:
-        raise AttributeError(f"Class {class_name} has not been found in {parser_module_name}")
+# Flags (e.g. --offline) can be given anywhere after the parsing argument
+flags = [a for a in sys.argv[1:] if a.startswith("--")]
+args = [a for a in sys.argv[1:] if not a.startswith("--")]
 
 # Handling parsing argument
 
-if len(sys.argv) > 1:
-    arg = sys.argv[1]
+if len(args) > 0:
+    arg = args[0]
 else:
     arg = "parse_none"
 
+# Stage timings go to a JSON run report and a Prometheus textfile, written after startup, after every chat turn and
+# on exit. A refresh, the terminal chat and the chat server each get their own files, so they don't overwrite each other
+if "--parse-only" in flags:
+    metrics_mode = "refresh"
+elif "--serve" in flags:
+    metrics_mode = "serve"
+else:
+    metrics_mode = "chat"
+metrics.configure(data.get("MetricsReport"), data.get("MetricsPrometheus"), metrics_mode)
+atexit.register(metrics.export)
+
+if arg == "parse_all" or arg in registry:
+    import_start = time.perf_counter()
+    from wiki_fetcher import get_fetcher, register_fetcher
+    from output_writer import set_output_format, get_database
+    from page_store import get_pages
+    startup_times.append(("wiki_fetcher", time.perf_counter() - import_start))
+
+    # Multi-item data files get written as one JSON document ("json"), one line per item as it is parsed ("jsonl") or
+    # upserted into a SQLite database keyed by the revision each page was fetched at ("sqlite")
+    set_output_format(
+        data.get("OutputFormat", "json"),
+        database_path=data.get("OutputDatabase", "wiki_data.db"),
+        revisions=lambda title: get_pages(data.get("WikiURL")).revision(title)
+    )
+
+    # A full rebuild can read every page from a local XML dump of the wiki instead of its API
+    dump_path = next((f.split("=", 1)[1] for f in flags if f.startswith("--dump=")), data.get("WikiDump"))
+    if dump_path:
+        from dump_reader import DumpFetcher
+        register_fetcher(data.get("WikiURL"), DumpFetcher(dump_path))
+
+    # Every extractor shares one pooled fetcher for the wiki, offline mode rebuilds from cached wikitext only
+    get_fetcher(
+        data.get("WikiURL"),
+        max_workers=data.get("FetchWorkers", 8),
+        cache_dir=data.get("CacheFolder"),
+        offline=data.get("OfflineMode", False) or "--offline" in flags,
+        max_retries=data.get("FetchMaxRetries", 5),
+        timeout=data.get("FetchTimeout", 30),
+        maxlag=data.get("FetchMaxLag", 5)
+    )
+
 if arg == "parse_all":
-    for parser in parsers:
-        parser["class"].extract_to_json(data.get("OutputFolder"), data.get("WikiURL"))
+    import_start = time.perf_counter()
+    from scheduler import Scheduler
+    startup_times.append(("scheduler", time.perf_counter() - import_start))
+
+    # Run every extractor at once, fetching on an I/O pool while pages get parsed on a process pool
+    scheduler = Scheduler(io_workers=data.get("FetchWorkers", 8), parse_workers=data.get("ParseWorkers"))
+    with metrics.span("refresh", parsers=len(registry.names())):
+        scheduler.run(registry.get_all(), data.get("OutputFolder"), data.get("WikiURL"))
 elif arg == "parse_none":
     print("Running code without updating parsing")
-elif len(sys.argv) > 1:
-    found = False
-    for parser in parsers:
-        if arg == parser["name"]:
-            found = True
-            parser["class"].extract_to_json(data.get("OutputFolder"), data.get("WikiURL"))
-    if not found:
-        print(f"Invalid argument given: {arg}")
+elif arg in registry:
+    from page_store import page_run
+    extractor = registry.get(arg)["class"]
+    with page_run(data.get("WikiURL")) as pages, metrics.span("extract", parser=arg):
+        pages.prefetch([extractor])
+        extractor.extract_to_json(data.get("OutputFolder"), data.get("WikiURL"))
+else:
+    print(f"Invalid argument given: {arg}")
+
+# The chat side reads the data folder, so a database refresh is exported back to the JSON files it expects (only the
+# files whose items changed, the rest stay as they are)
+if (arg == "parse_all" or arg in registry) and get_database() is not None:
+    with metrics.span("export_json"):
+        get_database().export_json(data.get("OutputFolder"), changed_only=True)
+    get_database().close()
 
 # ---------------------------------------------------------------------------------------------------------------------
 # Initializes OpenAI
 # ---------------------------------------------------------------------------------------------------------------------
 
+# Only load the OpenAI client when we are actually going to chat
+if "--parse-only" not in flags:
+    import_start = time.perf_counter()
+    from openai import OpenAI
+    from vector_sync import VectorStoreSync
+    from chat_context import ConversationContext
+    from session_store import SessionStore
+    from answer_cache import AnswerCache
+    from data_folder import DataVersionWatcher
+    from evidence_index import EvidenceIndex
+    from output_writer import find_output
+    startup_times.append(("openai", time.perf_counter() - import_start))
+
+# Report how long each import on the startup path took
+if "--startup-profile" in flags:
+    for parser_module_name, load_time in registry.load_times.items():
+        startup_times.append((f"parser {parser_module_name}", load_time))
+
+    print("Startup profile (import times):")
+    for label, seconds in startup_times:
+        print(f"  {label:<40} {seconds * 1000:8.1f} ms")
+    print(f"  {'total time to this point':<40} {(time.perf_counter() - startup_start) * 1000:8.1f} ms")
+
+if "--parse-only" in flags:
+    sys.exit(0)
+
 client = OpenAI(api_key=str(data.get("APIKey")))
-vector_store = client.vector_stores.create(name="Project Knowledge Base")
-
-data_dir = Path(data.get("OutputFolder"))
-file_ids = []
-
-# For every file in the data directory, upload to OpenAI
-for file_path in data_dir.glob("*"):
-    if file_path.is_file():
-            print(f"Uploading: {file_path.name}...")
-            
-            # Upload file to OpenAI and get file ID
-            with open(file_path, "rb") as f:
-                uploaded_file = client.files.create(
-                    file=f,
-                    purpose="assistants"
-                )
-                file_ids.append(uploaded_file.id)
-
-# If we have files, create a batch to add them to the vector store
-if file_ids:
-    print(f"Adding {len(file_ids)} files to Vector Store...")
-    
-    file_batch = client.vector_stores.file_batches.create_and_poll(
-      vector_store_id=vector_store.id,
-      file_ids=file_ids
+
+retrieval_mode = data.get("RetrievalMode", "file_search")
+if retrieval_mode not in ("file_search", "local"):
+    raise ValueError(f"Unknown RetrievalMode '{retrieval_mode}', expected 'file_search' or 'local'")
+
+if retrieval_mode == "local":
+    # Answer from a local BM25 index over the data folder, no vector store needed
+    from retrieval import BM25Index, format_passages
+    retrieval_index = BM25Index.load_or_build(
+        data.get("OutputFolder"),
+        data.get("RetrievalIndex", "retrieval_index.json")
     )
-    
-    print(f"Batch Status: {file_batch.status}")
-    print(f"Files successfully indexed: {file_batch.file_counts.completed}")
+    chat_tools = []
 else:
-    print("No files found in the data directory.")
+    # Reuse the vector store from the last run and only upload data files that are new or changed
+    vector_store_sync = VectorStoreSync(
+        client,
+        data.get("VectorStoreManifest", "vector_store_manifest.json"),
+        upload_workers=data.get("UploadWorkers", 4),
+        index_batch_size=data.get("IndexBatchSize", 4)
+    )
+    # Upload compact per-section records instead of the raw data files, when enabled
+    upload_folder = data.get("OutputFolder")
+    if data.get("ExportChunks", True):
+        from chunk_export import export_chunks
+        upload_folder = data.get("ExportFolder", "export")
+        export_chunks(data.get("OutputFolder"), upload_folder, data.get("ExportMaxTokens", 400))
+
+    with metrics.span("sync"):
+        vector_store_id = vector_store_sync.sync(upload_folder)
+    chat_tools = [{
+        "type": "file_search",
+        "vector_store_ids": [vector_store_id]
+    }]
+
+metrics.export()
 
 # # List files in the vector store to confirm
-# result = client.vector_stores.files.list(vector_store_id=vector_store.id)
+# result = client.vector_stores.files.list(vector_store_id=vector_store_id)
 # print(result)
 
-# Intialize conversation with system prompt
-system_prompt = {
-    "role": "system",
-    "content": str(data.get("AIPersonality"))
-}
+# Fold turns that fall out of the context window into a short rolling summary
+def summarize_turns(previous_summary, messages):
+    transcript = "\n".join(f"{message['role']}: {message['content']}" for message in messages)
+    if previous_summary:
+        transcript = f"Earlier summary: {previous_summary}\n{transcript}"
 
-conversation = [system_prompt]
+    response = client.responses.create(
+        model=str(data.get("AIModel")),
+        instructions="Summarize this conversation between a user and Jerry the Ghost Expert in a few sentences. "
+                     "Keep every fact, ghost name and question the user asked.",
+        input=transcript
+    )
+    return response.output_text
 
 
-# Used to handle chat interactions
-def chat(user_input: str):
-    global conversation
+# Intialize conversation with system prompt, keeping what we send within the configured budget
+def new_context():
+    return ConversationContext(
+        str(data.get("AIPersonality")),
+        mode=data.get("ContextMode", "window"),
+        max_turns=data.get("ContextMaxTurns", 10),
+        max_tokens=data.get("ContextMaxTokens", 4000),
+        summarize=summarize_turns
+    )
 
-    # Add user message
-    conversation.append({
-        "role": "user",
-        "content": user_input
-    })
 
-    # Call Responses API
-    response = client.responses.create(
-        model=str(data.get("AIModel")),
-        tools=[{
-            "type": "file_search",
-            "vector_store_ids": [vector_store.id]
-        }],
-        input=conversation
+# Every conversation is saved to a local SQLite file after each turn and only the most recently used ones stay in
+# memory, so a restart picks up where it left off
+sessions = SessionStore(
+    new_context,
+    db_path=data.get("SessionStore"),
+    max_memory_mb=data.get("SessionMemoryMB", 64),
+    ttl=data.get("SessionTTL", 30 * 86400)
+)
+sessions.expire()
+atexit.register(sessions.close)
+
+
+# Version of the data folder, only re-hashed once its files change
+data_watcher = DataVersionWatcher(data.get("OutputFolder"))
+
+# Repeated questions are answered from the cache, as long as the data folder hasn't changed since they were answered
+answer_cache = None
+if data.get("AnswerCache", True):
+    answer_cache = AnswerCache(
+        data_watcher.current(),
+        max_entries=data.get("AnswerCacheSize", 256),
+        ttl=data.get("AnswerCacheTTL", 86400),
+        cache_path=data.get("AnswerCacheFile")
     )
 
-    # Extract assistant text
-    assistant_message = response.output_text
 
-    # Add assistant message back to history
-    conversation.append({
-        "role": "assistant",
-        "content": assistant_message
-    })
+# "Which ghost has EMF 5, orbs and freezing" gets answered straight from the ghost data, without the model (opt-in)
+evidence_index = None
+if data.get("EvidenceShortCircuit", False) and find_output(data.get("OutputFolder"), "all_ghosts_data") is not None:
+    evidence_index = EvidenceIndex.load(data.get("OutputFolder"))
+
+
+# In local retrieval mode only the best matching sections of the data go along with the question
+def reference_for(user_input):
+    if retrieval_mode != "local":
+        return None
+    return format_passages(retrieval_index.search(user_input, data.get("RetrievalTopK", 5)))
+
+
+# Serve many users at once over HTTP/WebSocket instead of chatting in the terminal, every session gets its own
+# conversation while the vector store, answer cache and evidence index are shared
+if "--serve" in flags:
+    from openai import AsyncOpenAI
+    from chat_server import ChatServer
+
+    chat_server = ChatServer(
+        AsyncOpenAI(api_key=str(data.get("APIKey"))),
+        str(data.get("AIModel")),
+        chat_tools,
+        sessions,
+        answer_cache=answer_cache,
+        data_version=data_watcher.current,
+        evidence_index=evidence_index,
+        reference=reference_for,
+        max_concurrency=data.get("ServeMaxConcurrency", 32)
+    )
+    chat_server.run(data.get("ServeHost", "127.0.0.1"), data.get("ServePort", 8080))
+    sys.exit(0)
+
+
+# The terminal chat is one session of its own, every launch starts a new conversation unless --resume is given
+TERMINAL_SESSION = "terminal"
+if "--resume" not in flags:
+    sessions.delete(TERMINAL_SESSION)
+context = sessions.check_out(TERMINAL_SESSION)
+
+
+# Latency of every chat turn: seconds until the first token arrived (None when not streaming), in total, and where the
+# answer came from ("model", "cache" or "evidence index")
+turn_timings = []
+
+
+# Used to handle chat interactions, when on_text is given the reply is streamed to it as it is generated
+def chat(user_input: str, on_text=None):
+    start = time.perf_counter()
+    first_token = None
+    response_id = None
+    usage = None
+
+    def ask_model():
+        nonlocal first_token, response_id, usage
+
+        # Call Responses API with the system prompt, the recent history and the new user message
+        response = client.responses.create(
+            model=str(data.get("AIModel")),
+            tools=chat_tools,
+            stream=on_text is not None,
+            **context.request_args(user_input, reference_for(user_input))
+        )
+
+        if on_text is None:
+            # Extract assistant text
+            response_id = response.id
+            usage = response.usage
+            return response.output_text
+
+        # Pass every piece of text along as it arrives, and assemble the full message for the history
+        parts = []
+        for event in response:
+            if event.type == "response.output_text.delta":
+                if first_token is None:
+                    first_token = time.perf_counter() - start
+                parts.append(event.delta)
+                on_text(event.delta)
+            elif event.type == "response.completed":
+                response_id = event.response.id
+                usage = event.response.usage
+            elif event.type in ("response.failed", "error"):
+                raise RuntimeError(f"Streaming response failed: {event}")
+        return "".join(parts)
+
+    evidence_answer = evidence_index.answer_question(user_input) if evidence_index is not None else None
+    if evidence_answer is not None:
+        assistant_message, source = evidence_answer, "evidence index"
+    elif answer_cache is None or not (context.is_empty() or AnswerCache.is_standalone(user_input)):
+        # Follow-ups ("why?", "what about its weaknesses?") depend on the conversation, they aren't cached
+        assistant_message, source = ask_model(), "model"
+    else:
+        answer_cache.refresh(data_watcher.current())
+        assistant_message, asked = answer_cache.get_or_compute(user_input, ask_model)
+        source = "model" if asked else "cache"
+
+    # A cached or looked up answer arrives all at once
+    if source != "model" and on_text is not None:
+        first_token = time.perf_counter() - start
+        on_text(assistant_message)
+
+    turn_timings.append({"first_token": first_token, "total": time.perf_counter() - start, "source": source})
+
+    tokens = {}
+    if usage is not None:
+        tokens = {
+            "input_tokens": usage.input_tokens,
+            "output_tokens": usage.output_tokens,
+            "total_tokens": usage.total_tokens
+        }
+    metrics.record("chat_turn", turn_timings[-1]["total"], source=source, **tokens)
+    if first_token is not None:
+        metrics.record("chat_first_token", first_token, source=source)
+    metrics.export()
+
+    # Add the turn to the history
+    context.record(user_input, assistant_message, response_id)
+    sessions.save(TERMINAL_SESSION)
 
     return assistant_message
 
 
+stream_replies = data.get("StreamResponses", True)
+
 # Loop for user input
 while True:
     user = input("You: ")
     if user.lower() in ("quit", "exit"):
         break
 
-    reply = chat(user)
-    print("Bot:", reply)
-
+    if stream_replies:
+        print("Bot: ", end="", flush=True)
+        chat(user, on_text=lambda text: print(text, end="", flush=True))
+        print()
+    else:
+        reply = chat(user)
+        print("Bot:", reply)
+
+    if "--show-latency" in flags:
+        timing = turn_timings[-1]
+        first_token = f"{timing['first_token']:.2f}s" if timing["first_token"] is not None else "n/a"
+        source = f", from {timing['source']}" if timing["source"] != "model" else ""
+        print(f"(first token {first_token}, total {timing['total']:.2f}s{source})")
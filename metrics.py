@@ -0,0 +1,243 @@
+"""
+Module Name: metrics.py
+Description: This module records timed spans for every stage of a run (fetch, parse, write, upload, index
+             polling, chat turns) along with their counts, e.g. bytes, pages, retries and token usage. The
+             spans can be exported as a JSON run report and as a Prometheus textfile with per-stage latency
+             percentiles and totals. Each kind of process (a refresh, the terminal chat, the chat server) writes
+             its own files under its own metric prefix, so they don't overwrite each other.
+Author: Nathaniel Thoma
+Date: 2026-10-18
+"""
+
+from collections import deque
+from contextlib import contextmanager
+from functools import partial
+from contextvars import ContextVar, copy_context
+from pathlib import Path
+import threading
+import itertools
+import time
+import json
+import os
+
+# Only the most recent spans are kept individually, the per-stage totals cover everything
+MAX_SPANS = 10000
+
+# Per-stage durations kept for the percentiles
+MAX_SAMPLES = 5000
+
+PERCENTILES = (0.5, 0.9, 0.95, 0.99)
+
+# The span the current code is running in, so nested spans know their parent
+_current_span = ContextVar("current_span", default=None)
+
+class Span():
+
+    def __init__(self, span_id, name, parent_id, attributes):
+        self.id = span_id
+        self.name = name
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.start = time.time()
+        self.duration = None
+        self.thread = threading.current_thread().name
+
+    # Set an attribute, e.g. span.set("status", "completed")
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    # Add to a count, e.g. span.add("bytes", len(body))
+    def add(self, key, amount=1):
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "duration_s": self.duration,
+            "thread": self.thread,
+            "attributes": self.attributes
+        }
+
+
+class MetricsRecorder():
+
+    # -----------------------------------------------------------------------------------------------------------------
+    # Private Methods
+    # -----------------------------------------------------------------------------------------------------------------
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.started = time.time()
+        self.spans = deque(maxlen=MAX_SPANS)
+
+        # stages[name] = {"count", "total_s", "samples": recent durations, "counts": {attribute: total}}
+        self.stages = {}
+
+    def _finish(self, span):
+        with self.lock:
+            self.spans.append(span)
+
+            stage = self.stages.get(span.name)
+            if stage is None:
+                stage = {"count": 0, "total_s": 0.0, "samples": deque(maxlen=MAX_SAMPLES), "counts": {}}
+                self.stages[span.name] = stage
+
+            stage["count"] += 1
+            stage["total_s"] += span.duration
+            stage["samples"].append(span.duration)
+            for key, value in span.attributes.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    stage["counts"][key] = stage["counts"].get(key, 0) + value
+
+    def _percentile(self, samples, fraction):
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def _write_atomic(self, file_path, text):
+        file_path = Path(file_path)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = file_path.with_name(file_path.name + ".tmp")
+        with open(tmp_path, 'w') as f:
+            f.write(text)
+        os.replace(tmp_path, file_path)
+
+    # -----------------------------------------------------------------------------------------------------------------
+    # Public Methods
+    # -----------------------------------------------------------------------------------------------------------------
+
+    # Time a block of code as a span, e.g. with recorder.span("fetch", pages=50) as span: ...
+    @contextmanager
+    def span(self, name, **attributes):
+        parent = _current_span.get()
+        span = Span(next(self.ids), name, parent.id if parent else None, attributes)
+        token = _current_span.set(span)
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as error:
+            span.set("error", type(error).__name__)
+            raise
+        finally:
+            span.duration = time.perf_counter() - start
+            _current_span.reset(token)
+            self._finish(span)
+
+    # Record a span that was timed somewhere else (e.g. in a worker process)
+    def record(self, name, duration, **attributes):
+        parent = _current_span.get()
+        span = Span(next(self.ids), name, parent.id if parent else None, attributes)
+        span.start -= duration
+        span.duration = duration
+        self._finish(span)
+
+    # Per-stage count, total time, percentiles and summed counts
+    def summary(self):
+        with self.lock:
+            summary = {}
+            for name, stage in self.stages.items():
+                samples = list(stage["samples"])
+                summary[name] = {
+                    "count": stage["count"],
+                    "total_s": stage["total_s"],
+                    "max_s": max(samples),
+                    **{f"p{round(fraction * 100)}_s": self._percentile(samples, fraction) for fraction in PERCENTILES},
+                    "counts": dict(stage["counts"])
+                }
+            return summary
+
+    # JSON run report: when the run started, the per-stage summary and the most recent spans
+    def write_report(self, file_path):
+        with self.lock:
+            spans = [span.to_dict() for span in self.spans]
+        report = {
+            "started": self.started,
+            "written": time.time(),
+            "stages": self.summary(),
+            "spans": spans
+        }
+        self._write_atomic(file_path, json.dumps(report, indent=4))
+
+    # Prometheus textfile (for the node exporter's textfile collector)
+    def write_prometheus(self, file_path, prefix="jerry"):
+        summary = self.summary()
+        lines = [
+            f"# HELP {prefix}_stage_duration_seconds Time spent in each stage",
+            f"# TYPE {prefix}_stage_duration_seconds summary"
+        ]
+        for name, stage in summary.items():
+            for fraction in PERCENTILES:
+                value = stage[f"p{round(fraction * 100)}_s"]
+                lines.append(f'{prefix}_stage_duration_seconds{{stage="{name}",quantile="{fraction}"}} {value:.6f}')
+            lines.append(f'{prefix}_stage_duration_seconds_sum{{stage="{name}"}} {stage["total_s"]:.6f}')
+            lines.append(f'{prefix}_stage_duration_seconds_count{{stage="{name}"}} {stage["count"]}')
+
+        count_names = sorted({key for stage in summary.values() for key in stage["counts"]})
+        for key in count_names:
+            lines.append(f"# HELP {prefix}_stage_{key}_total Total {key.replace('_', ' ')} recorded by each stage")
+            lines.append(f"# TYPE {prefix}_stage_{key}_total counter")
+            for name, stage in summary.items():
+                if key in stage["counts"]:
+                    lines.append(f'{prefix}_stage_{key}_total{{stage="{name}"}} {stage["counts"][key]}')
+
+        lines.append(f"# HELP {prefix}_last_report_timestamp_seconds When this file was written")
+        lines.append(f"# TYPE {prefix}_last_report_timestamp_seconds gauge")
+        lines.append(f"{prefix}_last_report_timestamp_seconds {time.time():.0f}")
+        self._write_atomic(file_path, "\n".join(lines) + "\n")
+
+
+# The recorder every module reports to
+recorder = MetricsRecorder()
+
+# Where export() writes to, set from config.json (either can be None to skip it), and the Prometheus metric prefix
+_report_path = None
+_prometheus_path = None
+_prefix = "jerry"
+
+
+def span(name, **attributes):
+    return recorder.span(name, **attributes)
+
+
+def record(name, duration, **attributes):
+    recorder.record(name, duration, **attributes)
+
+
+# The span the calling code is running in, or None
+def current_span():
+    return _current_span.get()
+
+
+# Wrap fn to run in a copy of the calling code's context, for handing work to a thread pool
+# Pool threads don't carry context variables over, so without it spans opened there would lose their parent
+# Every submitted call needs its own wrapper, one context can't be entered by two threads at once
+def bind_context(fn):
+    return partial(copy_context().run, fn)
+
+
+# The file a mode writes to instead of file_path
+def _mode_path(file_path, mode):
+    if not file_path or not mode:
+        return file_path
+    file_path = Path(file_path)
+    return file_path.with_name(f"{file_path.stem}.{mode}{file_path.suffix}")
+
+
+# mode names the kind of process ("refresh", "chat", "serve"), it goes into the file names and the metric prefix,
+# e.g. metrics/run_report.json -> metrics/run_report.refresh.json and jerry_refresh_stage_duration_seconds
+def configure(report_path=None, prometheus_path=None, mode=None):
+    global _report_path, _prometheus_path, _prefix
+    _report_path = _mode_path(report_path, mode)
+    _prometheus_path = _mode_path(prometheus_path, mode)
+    _prefix = f"jerry_{mode}" if mode else "jerry"
+
+
+# Write the configured report files
+def export():
+    if _report_path:
+        recorder.write_report(_report_path)
+    if _prometheus_path:
+        recorder.write_prometheus(_prometheus_path, _prefix)
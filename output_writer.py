@@ -0,0 +1,223 @@
+"""
+Module Name: output_writer.py
+Description: This module provides the writers extractors use for their data files. For multi-item files in "json" mode
+             the items are collected and written as one indented JSON document, in "jsonl" mode every item is written
+             as a JSON line as soon as it is parsed, so memory stays flat and a failure late in a run keeps what was
+             already written. Every file only replaces the previous one once it is complete. In "sqlite" mode items
+             are upserted into the wiki database instead (see wiki_database.py).
+Author: Nathaniel Thoma
+Date: 2026-10-18
+"""
+
+from pathlib import Path
+import time
+import json
+import os
+import metrics
+
+OUTPUT_FORMATS = ("json", "jsonl", "sqlite")
+
+# Format every extractor writes in, set once from config.json
+_output_format = "json"
+
+# The WikiDatabase "sqlite" mode writes to
+_database = None
+
+
+# Pick the output format for every extractor in this run
+# "sqlite" needs the database path, and revisions(page title) -> revision id to key its upserts by
+def set_output_format(output_format, database_path=None, revisions=None):
+    global _output_format, _database
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format '{output_format}', expected one of {', '.join(OUTPUT_FORMATS)}")
+    _output_format = output_format
+
+    if output_format == "sqlite":
+        if not database_path:
+            raise ValueError("The sqlite output format needs a database path (OutputDatabase in config.json)")
+
+        # Imported here, wiki_database needs this module itself
+        from wiki_database import WikiDatabase
+        _database = WikiDatabase(database_path, revisions)
+
+
+# The database "sqlite" mode writes to, or None in the file formats
+def get_database():
+    return _database
+
+
+class _RecordWriter():
+
+    suffix = None
+
+    def __init__(self, output_dir, file_stem, group_key=None):
+        output_path = Path(output_dir)
+        output_path.mkdir(parents=True, exist_ok=True)
+
+        self.path = output_path / f"{file_stem}{self.suffix}"
+        self.tmp_path = self.path.with_name(self.path.name + ".tmp")
+        self.group_key = group_key
+        self.count = 0
+
+        # Seconds spent writing, reported as one "write" span when the file is done
+        self.write_s = 0.0
+
+        # The other format's file from an earlier run would otherwise be read alongside this one
+        self.stale_path = output_path / f"{file_stem}{'.jsonl' if self.suffix == '.json' else '.json'}"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, error_type, error, traceback):
+        if error_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    # Move the finished file into place
+    def _commit(self):
+        os.replace(self.tmp_path, self.path)
+        if self.stale_path.exists():
+            self.stale_path.unlink()
+        metrics.record("write", self.write_s, file=self.path.name, items=self.count, bytes=self.path.stat().st_size)
+
+
+class JsonWriter(_RecordWriter):
+
+    suffix = ".json"
+
+    def __init__(self, output_dir, file_stem, group_key=None):
+        super().__init__(output_dir, file_stem, group_key)
+        self.items = None
+
+    # Add an item, grouped under group if given ({group: [items]}) or in a plain list otherwise
+    def write(self, item, group=None):
+        if group is None:
+            if self.items is None:
+                self.items = []
+            self.items.append(item)
+        else:
+            if self.items is None:
+                self.items = {}
+            self.items.setdefault(group, []).append(item)
+        self.count += 1
+
+    # Declare a group up front, so it is written even if it ends up empty
+    def add_group(self, group):
+        if self.items is None:
+            self.items = {}
+        self.items.setdefault(group, [])
+
+    def close(self):
+        start = time.perf_counter()
+        with open(self.tmp_path, 'w') as f:
+            json.dump(self.items if self.items is not None else [], f, indent=4)
+        self.write_s += time.perf_counter() - start
+        self._commit()
+
+    def abort(self):
+        pass
+
+
+class JsonlWriter(_RecordWriter):
+
+    suffix = ".jsonl"
+
+    def __init__(self, output_dir, file_stem, group_key=None):
+        super().__init__(output_dir, file_stem, group_key)
+        self.file = open(self.tmp_path, 'w')
+
+    # Write an item straight to disk, with its group stored under group_key
+    def write(self, item, group=None):
+        start = time.perf_counter()
+        if group is not None:
+            item = {self.group_key: group, **item}
+        self.file.write(json.dumps(item))
+        self.file.write("\n")
+        self.file.flush()
+        self.count += 1
+        self.write_s += time.perf_counter() - start
+
+    # Groups are only stored on the items, so there is nothing to declare
+    def add_group(self, group):
+        pass
+
+    def close(self):
+        start = time.perf_counter()
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        self.write_s += time.perf_counter() - start
+        self._commit()
+
+    # Keep what was written so far next to the last complete file
+    def abort(self):
+        self.file.close()
+        print(f"Kept {self.count} records written before the failure in '{self.tmp_path.name}'")
+
+
+# Open a writer for a multi-item data file in the configured format, e.g. open_output(dir, "all_ghosts_data")
+# group_key names the field a jsonl record keeps its group in (JSON output nests groups instead)
+def open_output(output_dir, file_stem, group_key=None):
+    if _output_format == "sqlite":
+        return _database.writer(file_stem, group_key)
+    if _output_format == "jsonl":
+        return JsonlWriter(output_dir, file_stem, group_key)
+    return JsonWriter(output_dir, file_stem, group_key)
+
+
+# Write a single-item data file (one page's data) in the configured format, page is the wiki page it came from
+def write_json(output_dir, file_name, data, page=None):
+    if _output_format == "sqlite":
+        _database.write_single(Path(file_name).stem, data, page)
+        return
+    save_json(output_dir, file_name, data)
+
+
+# Write a single-item data file as indented JSON, replacing the old file only once it is complete
+def save_json(output_dir, file_name, data):
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    file_path = output_path / file_name
+    tmp_path = file_path.with_name(file_path.name + ".tmp")
+
+    with metrics.span("write", file=file_name, items=1) as span:
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=4)
+        os.replace(tmp_path, file_path)
+        span.set("bytes", file_path.stat().st_size)
+
+
+# The data file for file_stem in data_dir, whichever format it was written in (or None)
+def find_output(data_dir, file_stem):
+    for suffix in (".jsonl", ".json"):
+        file_path = Path(data_dir) / f"{file_stem}{suffix}"
+        if file_path.exists():
+            return file_path
+    return None
+
+
+# Lazily read the items of a data file one at a time, from either format
+# Grouped JSON files ({group: [items]}) yield their items with the group stored under group_key, like jsonl records
+def iter_records(file_path, group_key=None):
+    file_path = Path(file_path)
+
+    if file_path.suffix == ".jsonl":
+        with open(file_path, 'r') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        return
+
+    with open(file_path, 'r') as f:
+        data = json.load(f)
+
+    if isinstance(data, list):
+        yield from data
+    elif isinstance(data, dict) and all(isinstance(items, list) for items in data.values()):
+        for group, items in data.items():
+            for item in items:
+                yield {group_key: group, **item} if group_key else item
+    else:
+        yield data
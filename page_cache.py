@@ -0,0 +1,92 @@
+"""
+Module Name: page_cache.py
+Description: This module provides a persistent, compressed on-disk cache of raw page wikitext keyed by title and revision id.
+Author: Nathaniel Thoma
+Date: 2026-10-18
+"""
+
+from pathlib import Path
+import hashlib
+import threading
+import json
+import gzip
+import os
+
+class PageCache():
+
+    # -----------------------------------------------------------------------------------------------------------------
+    # Private Methods
+    # -----------------------------------------------------------------------------------------------------------------
+
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+        self.index_path = self.cache_dir / "index.json"
+        self._lock = threading.Lock()
+
+        # index["pages"] = {title: revid}, index["aliases"] = {requested title: resolved title}
+        self.index = {"pages": {}, "aliases": {}}
+        if self.index_path.exists():
+            with open(self.index_path, 'r') as f:
+                self.index = json.load(f)
+
+    # Each revision of a page gets its own gzip file
+    def _content_path(self, title, revid):
+        slug = hashlib.sha1(title.encode("utf-8")).hexdigest()
+        return self.cache_dir / f"{slug}-{revid}.txt.gz"
+
+    # -----------------------------------------------------------------------------------------------------------------
+    # Public Methods
+    # -----------------------------------------------------------------------------------------------------------------
+
+    # Map a requested title to the page title it resolved to last time we saw it
+    def resolve(self, title):
+        return self.index["aliases"].get(title, title)
+
+    # Record that a requested title resolves to a different page (normalization or redirect)
+    def add_alias(self, title, resolved_title):
+        with self._lock:
+            if title != resolved_title:
+                self.index["aliases"][title] = resolved_title
+
+    # Revision id of the cached copy of a page, or None if it isn't cached
+    def get_revid(self, title):
+        return self.index["pages"].get(title)
+
+    # Whether this exact revision of a page is in the cache
+    def has(self, title, revid):
+        return self.get_revid(title) == revid and self._content_path(title, revid).exists()
+
+    # Cached wikitext of a page, or None if it isn't cached
+    def get(self, title):
+        revid = self.get_revid(title)
+        if revid is None:
+            return None
+
+        content_path = self._content_path(title, revid)
+        if not content_path.exists():
+            return None
+
+        with gzip.open(content_path, 'rt', encoding="utf-8") as f:
+            return f.read()
+
+    # Store a new revision of a page, dropping the file for the previous revision
+    def put(self, title, revid, content):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with gzip.open(self._content_path(title, revid), 'wt', encoding="utf-8") as f:
+            f.write(content)
+
+        with self._lock:
+            old_revid = self.index["pages"].get(title)
+            self.index["pages"][title] = revid
+
+        if old_revid is not None and old_revid != revid:
+            self._content_path(title, old_revid).unlink(missing_ok=True)
+
+    # Write the index to disk (atomically, so a crash never leaves a half written index behind)
+    def save(self):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix(".json.tmp")
+        with self._lock:
+            with open(tmp_path, 'w') as f:
+                json.dump(self.index, f, indent=4)
+            os.replace(tmp_path, self.index_path)
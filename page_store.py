@@ -0,0 +1,120 @@
+"""
+Module Name: page_store.py
+Description: This module provides the run-scoped page store every extractor fetches through while a refresh is
+             running. Each title is only fetched once per run: identical requests that are in flight at the same time
+             share one fetch, and pages another extractor already fetched are handed out again, so every extractor
+             sees the same revision of a page. Extractors declare the pages they need up front (a "pages" attribute,
+             plus an optional linked_pages(pages) for pages found on those), so the whole run's page set can be
+             fetched in as few batched requests as possible before any extractor starts.
+Author: Nathaniel Thoma
+Date: 2026-10-18
+"""
+
+from concurrent.futures import Future
+from contextlib import contextmanager
+import threading
+from wiki_fetcher import get_fetcher
+import metrics
+
+# The page store of the run that is currently going on for each wiki URL
+_active_stores = {}
+_active_lock = threading.Lock()
+
+class PageStore():
+
+    # -----------------------------------------------------------------------------------------------------------------
+    # Private Methods
+    # -----------------------------------------------------------------------------------------------------------------
+
+    def __init__(self, fetcher):
+        self.fetcher = fetcher
+        self.lock = threading.Lock()
+
+        # pages[requested title] = Future of its wikitext (None if the page is missing), fetched or being fetched
+        self.pages = {}
+
+        # Titles handed out without fetching them again, and titles actually fetched
+        self.reused = 0
+        self.fetched = 0
+
+    # -----------------------------------------------------------------------------------------------------------------
+    # Public Methods
+    # -----------------------------------------------------------------------------------------------------------------
+
+    # Same as WikiFetcher.fetch_pages, but only titles this run hasn't asked for yet get fetched
+    def fetch_pages(self, titles):
+        unique_titles = list(dict.fromkeys(titles))
+
+        with self.lock:
+            new_titles = [title for title in unique_titles if title not in self.pages]
+            for title in new_titles:
+                self.pages[title] = Future()
+            self.reused += len(unique_titles) - len(new_titles)
+            self.fetched += len(new_titles)
+            futures = {title: self.pages[title] for title in unique_titles}
+
+        # This call fetches the new titles in one go, titles someone else is fetching are waited on below
+        if new_titles:
+            try:
+                contents = self.fetcher.fetch_pages(new_titles)
+            except BaseException as error:
+                for title in new_titles:
+                    futures[title].set_exception(error)
+                with self.lock:
+                    for title in new_titles:
+                        del self.pages[title]
+                raise
+            for title in new_titles:
+                futures[title].set_result(contents[title])
+
+        return {title: future.result() for title, future in futures.items()}
+
+    # Fetch a single page, raises KeyError if the page does not exist
+    def fetch_page(self, title):
+        content = self.fetch_pages([title])[title]
+        if content is None:
+            raise KeyError(f"Page '{title}' does not exist on {self.fetcher.url}")
+        return content
+
+    # Revision id of the page a title was fetched from in this run
+    def revision(self, title):
+        return self.fetcher.revision(title)
+
+    # Fetch every page the extractors declared, first their own pages, then the pages linked from those
+    def prefetch(self, extractors):
+        with metrics.span("prefetch") as span:
+            titles = [title for extractor in extractors for title in getattr(extractor, "pages", [])]
+            self.fetch_pages(titles)
+
+            linked_titles = [
+                title for extractor in extractors if hasattr(extractor, "linked_pages")
+                for title in extractor.linked_pages(self)
+            ]
+            self.fetch_pages(linked_titles)
+
+            span.set("pages", len(set(titles + linked_titles)))
+
+
+# Run the code in the block with a page store for the wiki, every extractor using get_pages(url) shares it
+@contextmanager
+def page_run(url):
+    store = PageStore(get_fetcher(url))
+    with _active_lock:
+        if url in _active_stores:
+            raise RuntimeError(f"Another run is already fetching pages from {url}")
+        _active_stores[url] = store
+
+    try:
+        yield store
+    finally:
+        with _active_lock:
+            del _active_stores[url]
+        print(f"Fetched {store.fetched} pages for this run, {store.reused} repeat lookups were served without fetching")
+
+
+# Used by the extractors: the running refresh's page store, or the shared fetcher outside of a run
+def get_pages(url):
+    store = _active_stores.get(url)
+    if store is not None:
+        return store
+    return get_fetcher(url)
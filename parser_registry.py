@@ -0,0 +1,75 @@
+"""
+Module Name: parser_registry.py
+Description: This module provides a lazy registry of the parser modules listed in config.json. A parser module is only
+             imported and its extractor only created the first time it is actually used.
+Author: Nathaniel Thoma
+Date: 2026-10-18
+"""
+
+import importlib.util
+import time
+import sys
+from pathlib import Path
+
+class ParserRegistry():
+
+    # -----------------------------------------------------------------------------------------------------------------
+    # Private Methods
+    # -----------------------------------------------------------------------------------------------------------------
+
+    def __init__(self, file_paths, class_name):
+        self.class_name = class_name
+        self.file_paths = {}
+        self._parsers = {}
+
+        # How long each parser module took to import, in seconds
+        self.load_times = {}
+
+        # Only the names are known up front, nothing gets imported here
+        for file_path in file_paths:
+            parser_path = Path(file_path).resolve()
+            if not parser_path.exists():
+                raise FileNotFoundError(f"The file {file_path} does not exist")
+
+            self.file_paths[parser_path.stem] = file_path
+
+    def _load(self, parser_module_name):
+        file_path = self.file_paths[parser_module_name]
+        start = time.perf_counter()
+
+        parser_spec = importlib.util.spec_from_file_location(parser_module_name, file_path)
+        if not parser_spec:
+            raise ImportError(f"Could not import module specification for {file_path}")
+
+        parser_module = importlib.util.module_from_spec(parser_spec)
+        sys.modules[parser_module_name] = parser_module
+        parser_spec.loader.exec_module(parser_module)
+
+        try:
+            parser_class = getattr(parser_module, self.class_name)
+        except AttributeError:
+            raise AttributeError(f"Class {self.class_name} has not been found in {parser_module_name}")
+
+        self.load_times[parser_module_name] = time.perf_counter() - start
+        return {"class": parser_class(), "name": parser_module_name}
+
+    # -----------------------------------------------------------------------------------------------------------------
+    # Public Methods
+    # -----------------------------------------------------------------------------------------------------------------
+
+    # Names of every registered parser, in config order
+    def names(self):
+        return list(self.file_paths)
+
+    def __contains__(self, parser_module_name):
+        return parser_module_name in self.file_paths
+
+    # Get a parser ({"class": extractor instance, "name": module name}), importing it on first use
+    def get(self, parser_module_name):
+        if parser_module_name not in self._parsers:
+            self._parsers[parser_module_name] = self._load(parser_module_name)
+        return self._parsers[parser_module_name]
+
+    # Get every parser, in config order
+    def get_all(self):
+        return [self.get(parser_module_name) for parser_module_name in self.names()]
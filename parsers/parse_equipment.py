@@ -5,15 +5,16 @@ Author: Nathaniel Thoma
 Date: 2025-12-19
 """
 
-from pathlib import Path
-import requests
-import mwparserfromhell
-import json
 import re
-from general_parser import GeneralParser
+from page_store import get_pages
+from scheduler import parse_in_order
+from output_writer import open_output
 
 class Extractor():
 
+    # Pages this extractor needs, fetched up front with every other extractor's in a refresh
+    pages = ["Equipment"]
+
     # -----------------------------------------------------------------------------------------------------------------
     # Private Methods
     # -----------------------------------------------------------------------------------------------------------------
@@ -25,39 +26,63 @@ class Extractor():
     # Public Methods
     # -----------------------------------------------------------------------------------------------------------------
 
-    def _extract_equipment_category(self, content, category, url):
+    # Find the names of every equipment item listed under a category header
+    def _find_equipment_names(self, content, category):
 
         pattern = r'^\|\[\[(?:[^\]|]*\|)?([^\]|]+)\]\]'
 
-        equipment_json = []
         if f"=={category} equipment==" in content:
             section = content.split(f"=={category} equipment==")[1]
             section = section.split("==")[0]
-            equipment_names = re.findall(pattern, section, re.MULTILINE)
-
-            for equipment_name in equipment_names:
-                params = {
-                    "action": "query",
-                    "titles": equipment_name,
-                    "prop": "revisions",
-                    "rvprop": "content",
-                    "rvslots": "main",
-                    "formatversion": 2,
-                    "format": "json",
-                    "origin": "*"
-                }
+            return re.findall(pattern, section, re.MULTILINE)
+
+        return []
 
-                res = requests.get(url, params=params).json()
-                page = res["query"]["pages"][0]
-                local_content = page["revisions"][0]["slots"]["main"]["content"]
+    # Every equipment page, so a refresh can fetch them along with the other extractors' pages
+    def linked_pages(self, pages):
+        content = pages.fetch_pages(["Equipment"])["Equipment"]
+        if content is None:
+            return []
+        return [
+            name for category in ("Starter", "Optional", "Truck")
+            for name in self._find_equipment_names(content, category)
+        ]
 
-                # Get the parsed Wikicode
-                parsed_code = mwparserfromhell.parse(local_content)
+    # Main function to parse all ghosts
+    def extract_to_json(self, output_dir, url):
+        pages = get_pages(url)
 
-                # Get Wiki Hierarchy
-                parsed_wiki = GeneralParser.parse_wiki_hierarchy(str(parsed_code))
-                unwanted = ["Notes", "References", "History", "Trivia", "Gallery", "See also", "Possible Writing Patterns"]
-                cleaned_wiki = GeneralParser.filter_sections(parsed_wiki, unwanted)
+        # Fetch the page content
+        content = pages.fetch_page("Equipment")
+
+        # Find every equipment item, then fetch all of their pages in as few requests as possible
+        starter_names = self._find_equipment_names(content, "Starter")
+        optional_names = self._find_equipment_names(content, "Optional")
+        truck_names = self._find_equipment_names(content, "Truck")
+        equipment_pages = pages.fetch_pages(starter_names + optional_names + truck_names)
+
+        # Parse each equipment page as its turn to be written comes (a few ahead while a scheduler is running), so only
+        # a handful of parsed pages are ever held at once
+        unwanted = ["Notes", "References", "History", "Trivia", "Gallery", "See also", "Possible Writing Patterns"]
+        categories = [
+            ("StarterEquipment", starter_names),
+            ("OptionalEquipment", optional_names),
+            ("TruckEquipment", truck_names)
+        ]
+        parsed_pages = parse_in_order((
+            ((category, equipment_name), equipment_pages[equipment_name])
+            for category, equipment_names in categories for equipment_name in equipment_names
+        ), unwanted)
+
+        # Extract all the equipment categories into one file, each item written out as soon as it is done
+        with open_output(output_dir, "all_equipment_data", group_key="Category") as writer:
+            for category, _ in categories:
+                writer.add_group(category)
+
+            for (category, equipment_name), content, cleaned_wiki in parsed_pages:
+                if content is None:
+                    print(f"Could not find a page for '{equipment_name}'")
+                    continue
 
                 # Export to JSON
                 final_data = {
@@ -65,48 +90,7 @@ class Extractor():
                     "Wiki Content": cleaned_wiki
                 }
 
-                equipment_json.append(final_data)
+                writer.write(final_data, group=category)
                 print(f"Processed data for '{equipment_name}'")
 
-        return equipment_json
-        
-
-    # Main function to parse all ghosts
-    def extract_to_json(self, output_dir, url):
-        params = {
-            "action": "query",
-            "titles": "Equipment",
-            "prop": "revisions",
-            "rvprop": "content",
-            "rvslots": "main",
-            "formatversion": 2,
-            "format": "json",
-            "origin": "*"
-        }
-
-        # Fetch the page content
-        request = requests.get(url, params=params)
-        res = request.json()
-        page = res["query"]["pages"][0]
-        content = page["revisions"][0]["slots"]["main"]["content"]
-
-        # Extract all the equipment categories
-        all_equipment_data = []
-        starter_equipment_json = self._extract_equipment_category(content=content, category="Starter", url=url)
-        optional_equipment_json = self._extract_equipment_category(content=content, category="Optional", url=url)
-        truck_equipment_json = self._extract_equipment_category(content=content, category="Truck", url=url)
-
-        # Put in one json file
-        all_equipment_data = {
-            "StarterEquipment": starter_equipment_json,
-            "OptionalEquipment": optional_equipment_json,
-            "TruckEquipment": truck_equipment_json
-        }
-
-        output_path = Path(output_dir)
-        output_path.mkdir(parents=True, exist_ok=True)
-        file_path = output_path / "all_equipment_data.json"
-        with open(file_path, 'w') as f:
-            json.dump(all_equipment_data, f, indent=4)
-
-        print("Successfully wrote all equipment data to 'all_equipment_data.json'")
\ No newline at end of file
+        print(f"Successfully wrote all equipment data to '{writer.path.name}'")
@@ -5,52 +5,32 @@ Author: Nathaniel Thoma
 Date: 2025-12-19
 """
 
-from pathlib import Path
-import requests
-import mwparserfromhell
-import json
 import re
-from general_parser import GeneralParser
+from page_store import get_pages
+from scheduler import submit_parse
+from output_writer import write_json
 
 class Extractor():
 
+    # Pages this extractor needs, fetched up front with every other extractor's in a refresh
+    pages = ["Equipment"]
+
     def __init__(self):
         pass
 
     # Main function to parse all ghosts
     def extract_to_json(self, output_dir, url):
-        params = {
-            "action": "query",
-            "titles": "Equipment",
-            "prop": "revisions",
-            "rvprop": "content",
-            "rvslots": "main",
-            "formatversion": 2,
-            "format": "json",
-            "origin": "*"
-        }
-
         # Fetch the page content
-        request = requests.get(url, params=params)
-        res = request.json()
-        page = res["query"]["pages"][0]
-        content = page["revisions"][0]["slots"]["main"]["content"]
-
-        # Get the parsed Wikicode
-        parsed_code = mwparserfromhell.parse(content)
+        content = get_pages(url).fetch_page("Equipment")
 
         # Get Wiki Hierarchy
-        parsed_wiki = GeneralParser.parse_wiki_hierarchy(str(parsed_code))
+        parsed_wiki = submit_parse(content).result()
 
         # Export to JSON
         final_data = {
             "Wiki Content": parsed_wiki
         }
 
-        output_path = Path(output_dir)
-        output_path.mkdir(parents=True, exist_ok=True)
-        file_path = output_path / "general_equipment_data.json"
-        with open(file_path, 'w') as f:
-            json.dump(final_data, f, indent=4)
+        write_json(output_dir, "general_equipment_data.json", final_data, page="Equipment")
 
         print("Successfully wrote general equipment data to 'general_equipment_data.json'")
@@ -5,54 +5,33 @@ Author: Nathaniel Thoma
 Date: 2025-12-19
 """
 
-from pathlib import Path
-import requests
-import mwparserfromhell
-import json
 import re
-from general_parser import GeneralParser
+from page_store import get_pages
+from scheduler import submit_parse
+from output_writer import write_json
 
 class Extractor():
 
+    # Pages this extractor needs, fetched up front with every other extractor's in a refresh
+    pages = ["Ghost"]
+
     def __init__(self):
         pass
 
     # Main function to parse all ghosts
     def extract_to_json(self, output_dir, url):
-        params = {
-            "action": "query",
-            "titles": "Ghost",
-            "prop": "revisions",
-            "rvprop": "content",
-            "rvslots": "main",
-            "formatversion": 2,
-            "format": "json",
-            "origin": "*"
-        }
-
         # Fetch the page content
-        request = requests.get(url, params=params)
-        res = request.json()
-        page = res["query"]["pages"][0]
-        content = page["revisions"][0]["slots"]["main"]["content"]
-
-        # Get the parsed Wikicode
-        parsed_code = mwparserfromhell.parse(content)
+        content = get_pages(url).fetch_page("Ghost")
 
         # Get Wiki Hierarchy
-        parsed_wiki = GeneralParser.parse_wiki_hierarchy(str(parsed_code))
         unwanted = ["See also", "References", "Trivia", "Evidence"]
-        cleaned_wiki = GeneralParser.filter_sections(parsed_wiki, unwanted)
+        cleaned_wiki = submit_parse(content, unwanted).result()
 
         # Export to JSON
         final_data = {
             "Wiki Content": cleaned_wiki
         }
 
-        output_path = Path(output_dir)
-        output_path.mkdir(parents=True, exist_ok=True)
-        file_path = output_path / "general_ghost_data.json"
-        with open(file_path, 'w') as f:
-            json.dump(final_data, f, indent=4)
+        write_json(output_dir, "general_ghost_data.json", final_data, page="Ghost")
 
         print("Successfully wrote general ghost data to 'general_ghost_data.json'")
@@ -5,15 +5,17 @@ Author: Nathaniel Thoma
 Date: 2025-12-19
 """
 
-from pathlib import Path
-import requests
-import mwparserfromhell
-import json
 import re
-from general_parser import GeneralParser
+from page_store import get_pages
+from scheduler import parse_in_order
+from evidence_index import EVIDENCE_MAP
+from output_writer import open_output
 
 class Extractor():
 
+    # Pages this extractor needs, fetched up front with every other extractor's in a refresh
+    pages = ["Ghost"]
+
     # -----------------------------------------------------------------------------------------------------------------
     # Private Methods
     # -----------------------------------------------------------------------------------------------------------------
@@ -30,17 +32,6 @@ class Extractor():
         pattern = r"\|\s*([\w\(\)]+)\s*=\s*(.*?)(?=\s*\|(?:\s*[\w\(\)]+\s*=)|\s*\}\})"
         pairs = re.findall(pattern, raw_text, re.DOTALL)
         
-        # Mapping for Phasmophobia Evidence Icons to actual names
-        evidence_map = {
-            "EMFReader_Render": "EMF Level 5",
-            "Fingerprints_3": "Ultraviolet",
-            "ClosedBook_Render": "Ghost Writing",
-            "SpiritBox_Render": "Spirit Box",
-            "DOTTSRender": "D.O.T.S Projector",
-            "GhostOrb_Render": "Ghost Orbs",
-            "Thermometer_Render": "Freezing Temperatures"
-        }
-
         for key, value in pairs:
             clean_val = value.strip()
 
@@ -56,7 +47,7 @@ class Extractor():
                     if file_name_match:
                         slug = file_name_match.group(1)
                         # Use mapping or the slug itself if not in map
-                        clean_val = evidence_map.get(slug, slug.replace("_", " "))
+                        clean_val = EVIDENCE_MAP.get(slug, slug.replace("_", " "))
 
             # B. General Cleanup (Remove remaining brackets, bolding, bullet points)
             clean_val = re.sub(r"\[\[(?:[^|\]]*\|)?([^\]]+)\]\]", r"\1", clean_val)
@@ -80,83 +71,68 @@ class Extractor():
 
         return result
 
+    # Names of every ghost in the "Types of ghosts" table of the Ghost page, or None if the table isn't there
+    def _find_ghost_names(self, content):
+        section_match = re.search(r"==Types of ghosts.*?\{\|(.*?)\|\}", content, re.DOTALL)
+        if not section_match:
+            return None
+
+        table_content = section_match.group(1)
+        return re.findall(r"\[\[(?:[^|\]]*\|)?([^\]]+)\]\]", table_content)
+
     # -----------------------------------------------------------------------------------------------------------------
     # Public Methods
     # -----------------------------------------------------------------------------------------------------------------
 
+    # Every ghost page, so a refresh can fetch them along with the other extractors' pages
+    def linked_pages(self, pages):
+        content = pages.fetch_pages(["Ghost"])["Ghost"]
+        if content is None:
+            return []
+        return self._find_ghost_names(content) or []
+
     # Main function to parse all ghosts
     def extract_to_json(self, output_dir, url):
-        params = {
-            "action": "query",
-            "titles": "Ghost",
-            "prop": "revisions",
-            "rvprop": "content",
-            "rvslots": "main",
-            "formatversion": 2,
-            "format": "json",
-            "origin": "*"
-        }
+        pages = get_pages(url)
 
         # Fetch the page content
-        request = requests.get(url, params=params)
-        res = request.json()
-        page = res["query"]["pages"][0]
-        content = page["revisions"][0]["slots"]["main"]["content"]
+        content = pages.fetch_page("Ghost")
 
         # Extract ghost names from table
-        section_match = re.search(r"==Types of ghosts.*?\{\|(.*?)\|\}", content, re.DOTALL)
-        if section_match:
-            table_content = section_match.group(1)
-            ghost_names = re.findall(r"\[\[(?:[^|\]]*\|)?([^\]]+)\]\]", table_content)
-        else:
-            print("Could not find the 'Types of ghosts' section in ", request.url)
-
-        # Process each ghost
-        all_ghosts_data = []
-        for ghost_name in ghost_names:
-
-            params = {
-                "action": "query",
-                "titles": ghost_name,
-                "prop": "revisions",
-                "rvprop": "content",
-                "rvslots": "main",
-                "formatversion": 2,
-                "format": "json",
-                "origin": "*"
-            }
-
-            res = requests.get(url, params=params).json()
-            page = res["query"]["pages"][0]
-            content = page["revisions"][0]["slots"]["main"]["content"]
-
-            # Get the parsed Wikicode
-            parsed_code = mwparserfromhell.parse(content)
-
-            # Get Ghost Summary
-            ghost_summary = self._parse_ghost_summary(str(parsed_code))
-
-            # Get Wiki Hierarchy
-            parsed_wiki = GeneralParser.parse_wiki_hierarchy(str(parsed_code))
-            unwanted = ["Notes", "References", "History", "Trivia", "Evidence"]
-            cleaned_wiki = GeneralParser.filter_sections(parsed_wiki, unwanted)
-
-            # Export to JSON
-            final_data = {
-                "Ghost Name": ghost_name,
-                "Ghost Summary": ghost_summary,
-                "Wiki Content": cleaned_wiki
-            }
-
-            all_ghosts_data.append(final_data)
-            print(f"Processed data for '{ghost_name}'")
-
-        #end loop
-
-        output_path = Path(output_dir)
-        output_path.mkdir(parents=True, exist_ok=True)
-        file_path = output_path / "all_ghosts_data.json"
-        with open(file_path, 'w') as f:
-            json.dump(all_ghosts_data, f, indent=4)
-
-        print("Successfully wrote all ghost data to 'all_ghosts_data.json'")
+        ghost_names = self._find_ghost_names(content)
+        if ghost_names is None:
+            ghost_names = []
+            print("Could not find the 'Types of ghosts' section in 'Ghost'")
+
+        # Fetch every ghost page in as few requests as possible
+        ghost_pages = pages.fetch_pages(ghost_names)
+
+        # Parse each ghost page as its turn to be written comes (a few ahead while a scheduler is running), so only a
+        # handful of parsed pages are ever held at once
+        unwanted = ["Notes", "References", "History", "Trivia", "Evidence"]
+        parsed_pages = parse_in_order(((ghost_name, ghost_pages[ghost_name]) for ghost_name in ghost_names), unwanted)
+
+        # Process each ghost, writing each one out as soon as it is done
+        with open_output(output_dir, "all_ghosts_data") as writer:
+            for ghost_name, content, cleaned_wiki in parsed_pages:
+
+                if content is None:
+                    print(f"Could not find a page for '{ghost_name}'")
+                    continue
+
+                # Get Ghost Summary
+                ghost_summary = self._parse_ghost_summary(content)
+
+                # Export to JSON
+                final_data = {
+                    "Ghost Name": ghost_name,
+                    "Ghost Summary": ghost_summary,
+                    "Wiki Content": cleaned_wiki
+                }
+
+                writer.write(final_data)
+                print(f"Processed data for '{ghost_name}'")
+
+            #end loop
+
+        print(f"Successfully wrote all ghost data to '{writer.path.name}'")
@@ -0,0 +1,131 @@
+"""
+Module Name: retrieval.py
+Description: This module provides a local BM25 retrieval index over the extracted data folder. Every section becomes
+             one passage, and only the best few passages for a question get put into the prompt.
+Author: Nathaniel Thoma
+Date: 2026-10-18
+
+Usage: python retrieval.py "<question>" [top k]    (prints the top passages and how long the search took)
+"""
+
+from collections import Counter
+from pathlib import Path
+import math
+import json
+import time
+import sys
+import re
+import os
+from data_folder import iter_sections, data_version
+
+class BM25Index():
+
+    # Standard BM25 parameters
+    K1 = 1.5
+    B = 0.75
+
+    token_pattern = re.compile(r"\w+")
+
+    # -----------------------------------------------------------------------------------------------------------------
+    # Private Methods
+    # -----------------------------------------------------------------------------------------------------------------
+
+    def __init__(self, passages, postings, doc_lengths, version=None):
+        self.passages = passages
+        self.postings = postings
+        self.doc_lengths = doc_lengths
+        self.version = version
+        self.avg_length = (sum(doc_lengths) / len(doc_lengths)) if doc_lengths else 0
+
+    def _idf(self, term):
+        doc_freq = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.passages) - doc_freq + 0.5) / (doc_freq + 0.5))
+
+    # -----------------------------------------------------------------------------------------------------------------
+    # Public Methods
+    # -----------------------------------------------------------------------------------------------------------------
+
+    def tokenize(text):
+        return BM25Index.token_pattern.findall(text.lower())
+
+    # Build the index from every section in the data folder
+    def build(data_dir):
+        passages = []
+        postings = {}
+        doc_lengths = []
+
+        for section in iter_sections(data_dir):
+            doc_id = len(passages)
+            passages.append(section)
+
+            # The breadcrumb path is indexed too, so "banshee abilities" finds the Banshee > Abilities section
+            terms = BM25Index.tokenize(f"{section['path']}\n{section['text']}")
+            doc_lengths.append(len(terms))
+            for term, count in Counter(terms).items():
+                postings.setdefault(term, []).append([doc_id, count])
+
+        return BM25Index(passages, postings, doc_lengths, version=data_version(data_dir))
+
+    def save(self, index_path):
+        tmp_path = Path(index_path).with_suffix(".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                "version": self.version,
+                "passages": self.passages,
+                "postings": self.postings,
+                "doc_lengths": self.doc_lengths
+            }, f)
+        os.replace(tmp_path, index_path)
+
+    def load(index_path):
+        with open(index_path, 'r') as f:
+            saved = json.load(f)
+        return BM25Index(saved["passages"], saved["postings"], saved["doc_lengths"], version=saved["version"])
+
+    # Load the saved index, rebuilding (and saving) it first if the data folder changed since it was built
+    def load_or_build(data_dir, index_path):
+        if Path(index_path).exists():
+            index = BM25Index.load(index_path)
+            if index.version == data_version(data_dir):
+                return index
+
+        print("Building local retrieval index...")
+        index = BM25Index.build(data_dir)
+        index.save(index_path)
+        return index
+
+    # Best k passages for a query, as a list of (score, passage)
+    def search(self, query, k=5):
+        scores = {}
+        for term in set(BM25Index.tokenize(query)):
+            idf = self._idf(term)
+            for doc_id, count in self.postings.get(term, ()):
+                length_norm = self.K1 * (1 - self.B + self.B * self.doc_lengths[doc_id] / self.avg_length)
+                scores[doc_id] = scores.get(doc_id, 0) + idf * count * (self.K1 + 1) / (count + length_norm)
+
+        best = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+        return [(score, self.passages[doc_id]) for doc_id, score in best]
+
+
+# The retrieved passages, formatted to go into the prompt
+def format_passages(results):
+    return "\n\n".join(f"[{passage['path']}]\n{passage['text']}" for _, passage in results)
+
+
+if __name__ == "__main__":
+    with open('config.json', 'r') as f:
+        data = json.load(f)
+
+    question = sys.argv[1] if len(sys.argv) > 1 else "banshee evidence"
+    top_k = int(sys.argv[2]) if len(sys.argv) > 2 else data.get("RetrievalTopK", 5)
+
+    start = time.perf_counter()
+    index = BM25Index.load_or_build(data.get("OutputFolder"), data.get("RetrievalIndex", "retrieval_index.json"))
+    print(f"Index ready in {(time.perf_counter() - start) * 1000:.1f} ms ({len(index.passages)} passages)")
+
+    start = time.perf_counter()
+    results = index.search(question, top_k)
+    print(f"Search took {(time.perf_counter() - start) * 1000:.2f} ms\n")
+
+    for score, passage in results:
+        print(f"{score:6.2f}  {passage['id']}")
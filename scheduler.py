@@ -0,0 +1,151 @@
+"""
+Module Name: scheduler.py
+Description: This module provides a pipelined scheduler for running every extractor at once, with network fetches on
+             an I/O thread pool and the CPU heavy wiki parsing on a process pool.
+Author: Nathaniel Thoma
+Date: 2026-10-18
+"""
+
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future
+from collections import deque
+import threading
+import time
+import os
+from general_parser import GeneralParser
+from page_store import page_run
+import metrics
+
+# The scheduler that is currently running extractors, if any
+_active_scheduler = None
+_active_lock = threading.Lock()
+
+class Scheduler():
+
+    # -----------------------------------------------------------------------------------------------------------------
+    # Private Methods
+    # -----------------------------------------------------------------------------------------------------------------
+
+    def __init__(self, io_workers=8, parse_workers=None):
+        self.io_workers = max(1, io_workers)
+        self.parse_workers = os.cpu_count() if parse_workers is None else parse_workers
+        self._parse_pool = None
+
+    def _run_extractor(self, parser, output_dir, url):
+        with metrics.span("extract", parser=parser["name"]):
+            parser["class"].extract_to_json(output_dir, url)
+
+    # -----------------------------------------------------------------------------------------------------------------
+    # Public Methods
+    # -----------------------------------------------------------------------------------------------------------------
+
+    # Queue a page to be parsed into its filtered hierarchy, returns a Future
+    def submit_parse(self, content, unwanted=None):
+        if self._parse_pool is None:
+            return _parse_inline(content, unwanted)
+
+        # The worker process times itself, the timings get recorded here once its result comes back
+        # (under the span that queued the page, the callback runs on one of the pool's own threads)
+        future = Future()
+        record_parse = metrics.bind_context(_record_parse)
+
+        def on_done(pool_future):
+            try:
+                parsed, parse_s = pool_future.result()
+            except Exception as e:
+                future.set_exception(e)
+                return
+            record_parse(content, parse_s)
+            future.set_result(parsed)
+
+        self._parse_pool.submit(_parse_timed, content, unwanted).add_done_callback(on_done)
+        return future
+
+    # Run every extractor at once: each one fetches on the I/O pool and hands its pages to the parse pool
+    # as they arrive, so fetching and parsing overlap. Every extractor still writes its own output file.
+    # The pages the extractors declare are fetched first, all together, and no page is fetched twice in a run.
+    def run(self, parsers, output_dir, url):
+        global _active_scheduler
+
+        with _active_lock:
+            if _active_scheduler is not None:
+                raise RuntimeError("Another scheduler is already running extractors")
+            _active_scheduler = self
+
+        try:
+            if self.parse_workers > 1:
+                self._parse_pool = ProcessPoolExecutor(max_workers=self.parse_workers)
+
+            with page_run(url) as pages:
+                pages.prefetch([parser["class"] for parser in parsers])
+
+                with ThreadPoolExecutor(max_workers=min(self.io_workers, len(parsers) or 1)) as io_pool:
+                    futures = [
+                        io_pool.submit(metrics.bind_context(self._run_extractor), parser, output_dir, url)
+                        for parser in parsers
+                    ]
+
+            # Report failures in the same order the serial path would have hit them
+            for parser, future in zip(parsers, futures):
+                if future.exception() is not None:
+                    print(f"Extractor '{parser['name']}' failed")
+                    raise future.exception()
+        finally:
+            if self._parse_pool is not None:
+                self._parse_pool.shutdown()
+                self._parse_pool = None
+            with _active_lock:
+                _active_scheduler = None
+
+
+# GeneralParser.parse_page, timed (unwanted sections are left out while parsing, so there is no separate filter step)
+def _parse_timed(content, unwanted):
+    start = time.perf_counter()
+    parsed = GeneralParser.parse_page(content, unwanted)
+    return parsed, time.perf_counter() - start
+
+
+def _record_parse(content, parse_s):
+    metrics.record("parse", parse_s, pages=1, bytes=len(content.encode("utf-8")))
+
+
+def _parse_inline(content, unwanted):
+    future = Future()
+    try:
+        parsed, parse_s = _parse_timed(content, unwanted)
+        _record_parse(content, parse_s)
+        future.set_result(parsed)
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+# Used by the extractors: parse on the running scheduler's process pool, or right away when running serially
+def submit_parse(content, unwanted=None):
+    scheduler = _active_scheduler
+    if scheduler is None:
+        return _parse_inline(content, unwanted)
+    return scheduler.submit_parse(content, unwanted)
+
+
+# Used by the extractors: parse pages in order, each one handed back just before the caller writes it out
+# pages is an iterable of (key, wikitext or None), yields (key, wikitext, parsed hierarchy or None for a missing page)
+# While a scheduler is running, at most `ahead` pages (twice the parse workers by default) are queued on its process
+# pool ahead of the caller, so only that many parsed trees are held at once. Serially every page is parsed in turn.
+def parse_in_order(pages, unwanted=None, ahead=None):
+    scheduler = _active_scheduler
+    if scheduler is None or scheduler._parse_pool is None:
+        for key, content in pages:
+            yield key, content, _parse_inline(content, unwanted).result() if content is not None else None
+        return
+
+    ahead = max(1, ahead or scheduler.parse_workers * 2)
+    queued = deque()
+    for key, content in pages:
+        queued.append((key, content, scheduler.submit_parse(content, unwanted) if content is not None else None))
+        if len(queued) > ahead:
+            key, content, job = queued.popleft()
+            yield key, content, job.result() if job is not None else None
+
+    while queued:
+        key, content, job = queued.popleft()
+        yield key, content, job.result() if job is not None else None
@@ -0,0 +1,180 @@
+"""
+Module Name: session_store.py
+Description: This module keeps the conversation context of every chat session. Only the most recently used sessions
+             stay in memory, within a memory budget, and the least recently used idle ones are evicted. Every session is
+             written to a local SQLite file as a compressed compact record after each turn, so an evicted session is
+             loaded back as soon as it is used again and a restart loses no context.
+Author: Nathaniel Thoma
+Date: 2026-10-18
+"""
+
+from collections import OrderedDict
+from pathlib import Path
+import threading
+import sqlite3
+import time
+import json
+import zlib
+
+class SessionStore():
+
+    # -----------------------------------------------------------------------------------------------------------------
+    # Private Methods
+    # -----------------------------------------------------------------------------------------------------------------
+
+    def __init__(self, new_context, db_path=None, max_memory_mb=64, ttl=None):
+        # new_context() -> a fresh ConversationContext, for new sessions and to load saved ones into
+        self.new_context = new_context
+        self.max_bytes = max_memory_mb * 1024 * 1024
+
+        # Sessions idle for longer than this many seconds are forgotten by expire(), None keeps them forever
+        self.ttl = ttl
+
+        self.lock = threading.Lock()
+
+        # resident[session id] = {"context", "size", "in_use" (turns running on it), "last_used"}, least recent first
+        self.resident = OrderedDict()
+        self.resident_bytes = 0
+
+        self.loads = 0
+        self.evictions = 0
+
+        # Without a database evicted sessions are simply forgotten
+        self.db = None
+        if db_path:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self.db = sqlite3.connect(db_path, check_same_thread=False)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS sessions "
+                "(id TEXT PRIMARY KEY, record BLOB NOT NULL, last_used REAL NOT NULL)"
+            )
+            self.db.commit()
+
+    # Saved record of a session, or None (call with the lock held)
+    def _read(self, session_id):
+        if self.db is None:
+            return None
+        row = self.db.execute("SELECT record FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is None:
+            return None
+        return json.loads(zlib.decompress(row[0]))
+
+    # (call with the lock held)
+    def _write(self, session_id, context, last_used):
+        if self.db is None:
+            return
+        record = zlib.compress(json.dumps(context.to_record(), separators=(",", ":")).encode("utf-8"))
+        self.db.execute(
+            "INSERT INTO sessions (id, record, last_used) VALUES (?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET record = excluded.record, last_used = excluded.last_used",
+            (session_id, record, last_used)
+        )
+        self.db.commit()
+
+    # Write a resident session to disk and update its size (call with the lock held)
+    def _save(self, session_id, entry):
+        entry["last_used"] = time.time()
+        size = entry["context"].size()
+        self.resident_bytes += size - entry["size"]
+        entry["size"] = size
+        self._write(session_id, entry["context"], entry["last_used"])
+
+    # Drop least recently used idle sessions until memory is back under budget (call with the lock held)
+    # Every session is already saved after its last turn, so evicting is just forgetting the in-memory copy
+    def _evict(self):
+        if self.resident_bytes <= self.max_bytes:
+            return
+        for session_id in list(self.resident):
+            if self.resident_bytes <= self.max_bytes:
+                break
+            entry = self.resident[session_id]
+            if entry["in_use"]:
+                continue
+            del self.resident[session_id]
+            self.resident_bytes -= entry["size"]
+            self.evictions += 1
+
+    # -----------------------------------------------------------------------------------------------------------------
+    # Public Methods
+    # -----------------------------------------------------------------------------------------------------------------
+
+    # The context of a session, loaded from disk if it was evicted or created if it is new
+    # It stays in memory until check_in is called for it
+    def check_out(self, session_id):
+        with self.lock:
+            entry = self.resident.get(session_id)
+            if entry is None:
+                context = self.new_context()
+                record = self._read(session_id)
+                if record is not None:
+                    context.load_record(record)
+                    self.loads += 1
+                entry = {"context": context, "size": context.size(), "in_use": 0, "last_used": time.time()}
+                self.resident[session_id] = entry
+                self.resident_bytes += entry["size"]
+
+            entry["in_use"] += 1
+            self.resident.move_to_end(session_id)
+            return entry["context"]
+
+    # Done with a session for now, save it and make room if memory is over budget
+    def check_in(self, session_id):
+        with self.lock:
+            entry = self.resident.get(session_id)
+            if entry is None:
+                return
+
+            entry["in_use"] -= 1
+            self._save(session_id, entry)
+            self._evict()
+
+    # Save a session that stays checked out, e.g. after every turn of the terminal chat
+    def save(self, session_id):
+        with self.lock:
+            entry = self.resident.get(session_id)
+            if entry is not None:
+                self._save(session_id, entry)
+
+    # Forget a session, in memory and on disk
+    def delete(self, session_id):
+        with self.lock:
+            entry = self.resident.pop(session_id, None)
+            if entry is not None:
+                self.resident_bytes -= entry["size"]
+            if self.db is not None:
+                self.db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+                self.db.commit()
+
+    # Forget every session that has been idle for longer than the time to live
+    def expire(self):
+        if self.ttl is None:
+            return
+        cutoff = time.time() - self.ttl
+        with self.lock:
+            for session_id in [sid for sid, entry in self.resident.items() if entry["last_used"] < cutoff]:
+                entry = self.resident[session_id]
+                if not entry["in_use"]:
+                    del self.resident[session_id]
+                    self.resident_bytes -= entry["size"]
+            if self.db is not None:
+                self.db.execute("DELETE FROM sessions WHERE last_used < ?", (cutoff,))
+                self.db.commit()
+
+    def stats(self):
+        with self.lock:
+            saved = self.db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0] if self.db is not None else None
+            return {
+                "resident": len(self.resident),
+                "resident_bytes": self.resident_bytes,
+                "saved": saved,
+                "loads": self.loads,
+                "evictions": self.evictions
+            }
+
+    def close(self):
+        with self.lock:
+            if self.db is not None:
+                self.db.close()
+                self.db = None
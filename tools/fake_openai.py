@@ -0,0 +1,322 @@
+"""
+Module Name: fake_openai.py
+Description: A local stand-in for the OpenAI files, vector store and responses endpoints, for trying out the knowledge
+             base sync and the chat (including streaming) without touching the real API.
+             Point the client at it with OPENAI_BASE_URL=http://127.0.0.1:8600/v1
+Author: Nathaniel Thoma
+Date: 2026-10-18
+
+Usage: python tools/fake_openai.py [port] [index delay in seconds] [delay per streamed token in seconds]
+       GET /_stats returns how many times each endpoint was called
+"""
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from collections import Counter
+import threading
+import json
+import time
+import uuid
+import sys
+import re
+
+class FakeOpenAIState():
+
+    def __init__(self, index_delay=0, token_delay=0):
+        self.lock = threading.Lock()
+        self.index_delay = index_delay
+        self.token_delay = token_delay
+        self.files = {}
+        self.vector_stores = {}
+        self.batches = {}
+        self.calls = Counter()
+
+    def new_id(self, prefix):
+        return f"{prefix}-{uuid.uuid4().hex[:24]}"
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+
+    # Silence the default per-request logging
+    def log_message(self, format, *args):
+        pass
+
+    # -----------------------------------------------------------------------------------------------------------------
+    # Helpers
+    # -----------------------------------------------------------------------------------------------------------------
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _not_found(self, message="Not found"):
+        self._send_json({"error": {"message": message, "type": "invalid_request_error", "code": None}}, status=404)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length) if length else b""
+
+    def _read_json(self):
+        body = self._read_body()
+        return json.loads(body) if body else {}
+
+    # Pull the uploaded file name and size out of a multipart upload without a full multipart parser
+    def _read_upload(self):
+        body = self._read_body()
+        match = re.search(rb'name="file"; filename="([^"]*)"\r\n(?:[^\r\n]*\r\n)*\r\n', body)
+        if not match:
+            return "upload", len(body)
+
+        boundary = body.split(b"\r\n", 1)[0]
+        end = body.find(b"\r\n" + boundary, match.end())
+        return match.group(1).decode("utf-8"), max(0, end - match.end())
+
+    # Batches stay in progress for index_delay seconds after they are created
+    def _batch_object(self, batch):
+        done = time.time() - batch["started"] >= self.server.state.index_delay
+        return {
+            "id": batch["id"],
+            "object": "vector_store.files_batch",
+            "created_at": batch["created_at"],
+            "status": "completed" if done else "in_progress",
+            "vector_store_id": batch["vector_store_id"],
+            "file_counts": {
+                "in_progress": 0 if done else len(batch["file_ids"]),
+                "completed": len(batch["file_ids"]) if done else 0,
+                "failed": 0,
+                "cancelled": 0,
+                "total": len(batch["file_ids"])
+            }
+        }
+
+    def _vector_store_object(self, vector_store):
+        return {
+            "id": vector_store["id"],
+            "object": "vector_store",
+            "created_at": vector_store["created_at"],
+            "name": vector_store["name"],
+            "status": "completed",
+            "usage_bytes": 0,
+            "file_counts": {
+                "in_progress": 0,
+                "completed": len(vector_store["file_ids"]),
+                "failed": 0,
+                "cancelled": 0,
+                "total": len(vector_store["file_ids"])
+            }
+        }
+
+    # The fake model just repeats the last user message back
+    def _fake_reply(self, request):
+        user_input = request.get("input")
+        if isinstance(user_input, list):
+            user_messages = [m for m in user_input if isinstance(m, dict) and m.get("role") == "user"]
+            user_input = user_messages[-1]["content"] if user_messages else ""
+        return f"Jerry here! You asked: {user_input}"
+
+    def _response_object(self, response_id, request, text, status="completed"):
+        input_tokens = len(json.dumps(request.get("input", ""))) // 4
+        output_tokens = len(text) // 4
+        return {
+            "id": response_id,
+            "object": "response",
+            "created_at": int(time.time()),
+            "status": status,
+            "model": request.get("model"),
+            "previous_response_id": request.get("previous_response_id"),
+            "output": [] if status != "completed" else [{
+                "type": "message",
+                "id": f"msg_{response_id}",
+                "role": "assistant",
+                "status": "completed",
+                "content": [{"type": "output_text", "text": text, "annotations": []}]
+            }],
+            "parallel_tool_calls": True,
+            "tool_choice": "auto",
+            "tools": request.get("tools", []),
+            "usage": {
+                "input_tokens": input_tokens,
+                "input_tokens_details": {"cached_tokens": 0},
+                "output_tokens": output_tokens,
+                "output_tokens_details": {"reasoning_tokens": 0},
+                "total_tokens": input_tokens + output_tokens
+            }
+        }
+
+    # Send a reply as server-sent events, one delta per word
+    def _stream_response(self, response_id, request, text):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        sequence_number = 0
+
+        def send_event(event):
+            nonlocal sequence_number
+            event["sequence_number"] = sequence_number
+            sequence_number += 1
+            self.wfile.write(f"event: {event['type']}\ndata: {json.dumps(event)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        send_event({"type": "response.created",
+                    "response": self._response_object(response_id, request, "", status="in_progress")})
+
+        words = re.findall(r"\S+\s*", text)
+        for word in words:
+            time.sleep(self.server.state.token_delay)
+            send_event({"type": "response.output_text.delta", "item_id": f"msg_{response_id}",
+                        "output_index": 0, "content_index": 0, "delta": word, "logprobs": []})
+
+        send_event({"type": "response.output_text.done", "item_id": f"msg_{response_id}",
+                    "output_index": 0, "content_index": 0, "text": text, "logprobs": []})
+        send_event({"type": "response.completed", "response": self._response_object(response_id, request, text)})
+
+    # -----------------------------------------------------------------------------------------------------------------
+    # Routes
+    # -----------------------------------------------------------------------------------------------------------------
+
+    def do_GET(self):
+        state = self.server.state
+        path = self.path.split("?")[0]
+
+        if path == "/_stats":
+            with state.lock:
+                return self._send_json(dict(state.calls))
+
+        match = re.fullmatch(r"/v1/vector_stores/([^/]+)", path)
+        if match:
+            with state.lock:
+                state.calls["vector_stores.retrieve"] += 1
+                vector_store = state.vector_stores.get(match.group(1))
+                if vector_store is None:
+                    return self._not_found(f"No vector store found with id '{match.group(1)}'")
+                return self._send_json(self._vector_store_object(vector_store))
+
+        match = re.fullmatch(r"/v1/vector_stores/([^/]+)/file_batches/([^/]+)", path)
+        if match:
+            with state.lock:
+                state.calls["file_batches.retrieve"] += 1
+                batch = state.batches.get(match.group(2))
+                if batch is None:
+                    return self._not_found()
+                return self._send_json(self._batch_object(batch))
+
+        match = re.fullmatch(r"/v1/vector_stores/([^/]+)/(?:file_batches/([^/]+)/)?files", path)
+        if match:
+            with state.lock:
+                state.calls["vector_stores.files.list"] += 1
+                vector_store = state.vector_stores.get(match.group(1))
+                if vector_store is None:
+                    return self._not_found()
+                file_ids = state.batches[match.group(2)]["file_ids"] if match.group(2) else vector_store["file_ids"]
+                files = [
+                    {"id": file_id, "object": "vector_store.file", "status": "completed",
+                     "vector_store_id": vector_store["id"], "created_at": 0, "usage_bytes": 0}
+                    for file_id in file_ids
+                ]
+                # The fake never fails to index, so a status filter other than completed is always empty
+                if "filter=" in self.path and "filter=completed" not in self.path:
+                    files = []
+                return self._send_json({"object": "list", "data": files, "has_more": False,
+                                        "first_id": None, "last_id": None})
+
+        self._not_found()
+
+    def do_POST(self):
+        state = self.server.state
+        path = self.path.split("?")[0]
+
+        if path == "/v1/files":
+            file_name, size = self._read_upload()
+            with state.lock:
+                state.calls["files.create"] += 1
+                file_id = state.new_id("file")
+                state.files[file_id] = {"id": file_id, "filename": file_name, "bytes": size}
+            return self._send_json({
+                "id": file_id, "object": "file", "bytes": size, "created_at": int(time.time()),
+                "filename": file_name, "purpose": "assistants", "status": "processed"
+            })
+
+        if path == "/v1/responses":
+            request = self._read_json()
+            with state.lock:
+                state.calls["responses.create"] += 1
+                response_id = state.new_id("resp")
+
+            text = self._fake_reply(request)
+            if request.get("stream"):
+                return self._stream_response(response_id, request, text)
+
+            time.sleep(state.token_delay * len(text.split()))
+            return self._send_json(self._response_object(response_id, request, text))
+
+        if path == "/v1/vector_stores":
+            request = self._read_json()
+            with state.lock:
+                state.calls["vector_stores.create"] += 1
+                vector_store_id = state.new_id("vs")
+                state.vector_stores[vector_store_id] = {
+                    "id": vector_store_id, "name": request.get("name"), "created_at": int(time.time()), "file_ids": []
+                }
+                return self._send_json(self._vector_store_object(state.vector_stores[vector_store_id]))
+
+        match = re.fullmatch(r"/v1/vector_stores/([^/]+)/file_batches", path)
+        if match:
+            request = self._read_json()
+            with state.lock:
+                state.calls["file_batches.create"] += 1
+                vector_store = state.vector_stores.get(match.group(1))
+                if vector_store is None:
+                    return self._not_found()
+                batch_id = state.new_id("vsfb")
+                state.batches[batch_id] = {
+                    "id": batch_id, "vector_store_id": vector_store["id"],
+                    "created_at": int(time.time()), "started": time.time(),
+                    "file_ids": list(request.get("file_ids", []))
+                }
+                vector_store["file_ids"].extend(request.get("file_ids", []))
+                return self._send_json(self._batch_object(state.batches[batch_id]))
+
+        self._not_found()
+
+    def do_DELETE(self):
+        state = self.server.state
+        path = self.path.split("?")[0]
+
+        match = re.fullmatch(r"/v1/files/([^/]+)", path)
+        if match:
+            with state.lock:
+                state.calls["files.delete"] += 1
+                if state.files.pop(match.group(1), None) is None:
+                    return self._not_found()
+            return self._send_json({"id": match.group(1), "object": "file", "deleted": True})
+
+        match = re.fullmatch(r"/v1/vector_stores/([^/]+)/files/([^/]+)", path)
+        if match:
+            with state.lock:
+                state.calls["vector_stores.files.delete"] += 1
+                vector_store = state.vector_stores.get(match.group(1))
+                if vector_store is None or match.group(2) not in vector_store["file_ids"]:
+                    return self._not_found()
+                vector_store["file_ids"].remove(match.group(2))
+            return self._send_json({"id": match.group(2), "object": "vector_store.file.deleted", "deleted": True})
+
+        self._not_found()
+
+
+def make_server(port=8600, index_delay=0, token_delay=0):
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeOpenAIHandler)
+    server.state = FakeOpenAIState(index_delay, token_delay)
+    return server
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8600
+    index_delay = float(sys.argv[2]) if len(sys.argv) > 2 else 0
+    token_delay = float(sys.argv[3]) if len(sys.argv) > 3 else 0
+    print(f"Fake OpenAI API listening on http://127.0.0.1:{port}/v1")
+    make_server(port, index_delay, token_delay).serve_forever()
@@ -0,0 +1,181 @@
+"""
+Module Name: fake_wiki.py
+Description: A local stand-in for the MediaWiki api.php the extractors fetch from, serving recorded wikitext fixtures
+             so the parsers can be run and benchmarked offline. It answers the revisions queries WikiFetcher makes,
+             including title normalization, redirects and missing pages. It can also throttle like a busy wiki:
+             429s past a number of concurrent requests, and a share of random 503, 500 and maxlag responses.
+             Point WikiURL at http://127.0.0.1:8700/api.php
+Author: Nathaniel Thoma
+Date: 2026-10-18
+
+Usage: python tools/fake_wiki.py [port] [fixtures file] [max concurrent requests, 0 for no limit] [error rate]
+                                 [seconds per response] [Retry-After seconds]
+       GET /_stats returns how many queries and titles were served and how many requests were throttled
+"""
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from collections import Counter
+from pathlib import Path
+import threading
+import hashlib
+import random
+import json
+import time
+import sys
+
+DEFAULT_FIXTURES = Path(__file__).resolve().parent.parent / "benchmarks" / "fixtures" / "wiki_pages.json"
+
+class FakeWikiState():
+
+    def __init__(self, fixtures_path=DEFAULT_FIXTURES, max_concurrent=0, error_rate=0, latency=0, retry_after=1):
+        with open(fixtures_path, 'r', encoding="utf-8") as f:
+            fixtures = json.load(f)
+
+        self.lock = threading.Lock()
+        self.pages = fixtures["pages"]
+        self.redirects = fixtures.get("redirects", {})
+        self.calls = Counter()
+
+        # Throttling
+        self.max_concurrent = max_concurrent
+        self.error_rate = error_rate
+        self.latency = latency
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.random = random.Random(0)
+
+    # Revision ids stay the same for the same content, so a page cache behaves like it would against the real wiki
+    def revid(self, title):
+        return int(hashlib.sha1(self.pages[title].encode("utf-8")).hexdigest()[:8], 16)
+
+
+class FakeWikiHandler(BaseHTTPRequestHandler):
+
+    # Silence the default per-request logging
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status=200, retry_after=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if retry_after is not None:
+            self.send_header("Retry-After", str(retry_after))
+        self.end_headers()
+        self.wfile.write(body)
+
+    # Answer like a struggling wiki would, returns True if the request got throttled or failed
+    def _throttle(self):
+        state = self.server.state
+        with state.lock:
+            too_many = state.max_concurrent and state.in_flight > state.max_concurrent
+            failure = None if too_many else (
+                state.random.choice(("503", "500", "maxlag")) if state.random.random() < state.error_rate else None
+            )
+            if too_many:
+                state.calls["throttled 429"] += 1
+            elif failure:
+                state.calls[f"failed {failure}"] += 1
+
+        if too_many:
+            self._send_json({"error": {"code": "ratelimited", "info": "Too many requests"}}, 429, state.retry_after)
+        elif failure == "503":
+            self._send_json({"error": {"code": "unavailable", "info": "Service unavailable"}}, 503, state.retry_after)
+        elif failure == "500":
+            self._send_json({"error": {"code": "internal", "info": "Internal error"}}, 500)
+        elif failure == "maxlag":
+            lag = {"code": "maxlag", "info": "Waiting for a database server: 7 seconds lagged", "lag": 7}
+            self._send_json({"error": lag}, 200, state.retry_after)
+        return bool(too_many or failure)
+
+    # MediaWiki capitalizes the first letter and treats underscores as spaces
+    def _normalize(self, title):
+        title = title.replace("_", " ").strip()
+        return title[:1].upper() + title[1:]
+
+    def _query(self, params):
+        state = self.server.state
+        titles = params.get("titles", "").split("|") if params.get("titles") else []
+        with_content = "content" in params.get("rvprop", "")
+
+        normalized = []
+        redirects = []
+        pages = []
+        for title in titles:
+            page_title = self._normalize(title)
+            if page_title != title:
+                normalized.append({"from": title, "to": page_title})
+
+            if params.get("redirects") and page_title in state.redirects:
+                redirects.append({"from": page_title, "to": state.redirects[page_title]})
+                page_title = state.redirects[page_title]
+
+            if page_title not in state.pages:
+                pages.append({"ns": 0, "title": page_title, "missing": True})
+                continue
+
+            revision = {"revid": state.revid(page_title)}
+            if with_content:
+                revision["slots"] = {"main": {"contentmodel": "wikitext", "content": state.pages[page_title]}}
+            pages.append({
+                "pageid": state.revid(page_title) % 10**6,
+                "ns": 0,
+                "title": page_title,
+                "revisions": [revision]
+            })
+
+        with state.lock:
+            state.calls["queries"] += 1
+            state.calls["titles"] += len(titles)
+
+        query = {"pages": pages}
+        if normalized:
+            query["normalized"] = normalized
+        if redirects:
+            query["redirects"] = redirects
+        return {"batchcomplete": True, "query": query}
+
+    def do_GET(self):
+        url = urlparse(self.path)
+
+        if url.path == "/_stats":
+            with self.server.state.lock:
+                return self._send_json(dict(self.server.state.calls))
+
+        if url.path != "/api.php":
+            return self._send_json({"error": {"code": "notfound", "info": f"No route for {url.path}"}}, status=404)
+
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        if params.get("action") != "query":
+            return self._send_json({"error": {"code": "badvalue", "info": "Only action=query is supported"}})
+
+        state = self.server.state
+        with state.lock:
+            state.in_flight += 1
+        try:
+            time.sleep(state.latency)
+            if not self._throttle():
+                self._send_json(self._query(params))
+        finally:
+            with state.lock:
+                state.in_flight -= 1
+
+
+# Port 0 picks a free port, the one in use is server.server_address[1]
+def make_server(port=8700, fixtures_path=DEFAULT_FIXTURES, max_concurrent=0, error_rate=0, latency=0, retry_after=1):
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeWikiHandler)
+    server.state = FakeWikiState(fixtures_path, max_concurrent, error_rate, latency, retry_after)
+    return server
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8700
+    fixtures_path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_FIXTURES
+    max_concurrent = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    error_rate = float(sys.argv[4]) if len(sys.argv) > 4 else 0
+    latency = float(sys.argv[5]) if len(sys.argv) > 5 else 0
+    retry_after = float(sys.argv[6]) if len(sys.argv) > 6 else 1
+    print(f"Fake MediaWiki API listening on http://127.0.0.1:{port}/api.php")
+    make_server(port, fixtures_path, max_concurrent, error_rate, latency, retry_after).serve_forever()
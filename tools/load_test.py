@@ -0,0 +1,113 @@
+"""
+Module Name: load_test.py
+Description: Load test for the chat server ("python main.py parse_none --serve"). A number of simulated users each hold
+             their own session and send questions one after another, over HTTP or WebSocket, and the latency
+             percentiles and throughput get reported at the end. Run the server against tools/fake_openai.py (with a
+             token delay) to measure the server itself rather than the model.
+Author: Nathaniel Thoma
+Date: 2026-10-18
+
+Usage: python tools/load_test.py [users] [turns per user] [--url=http://127.0.0.1:8080] [--ws] [--repeat]
+       --ws      chat over the WebSocket endpoint instead of POST /chat (also reports time to the first token)
+       --repeat  every user asks the same questions, so the answer cache gets exercised
+"""
+
+import statistics
+import asyncio
+import time
+import uuid
+import sys
+import aiohttp
+
+QUESTIONS = [
+    "What does the Banshee do?",
+    "How do I tell a Mare from an Onryo?",
+    "What is the best way to use a crucifix?",
+    "Which ghosts hunt early?",
+    "What does a spirit box do?"
+]
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def question_for(user, turn, repeat):
+    question = QUESTIONS[turn % len(QUESTIONS)]
+    return question if repeat else f"{question} ({user}-{turn}-{uuid.uuid4().hex[:6]})"
+
+
+async def http_user(session, url, user, turns, repeat, results):
+    session_id = None
+    for turn in range(turns):
+        start = time.perf_counter()
+        payload = {"session_id": session_id, "message": question_for(user, turn, repeat)}
+        async with session.post(f"{url}/chat", json=payload) as response:
+            if response.status != 200:
+                results["errors"] += 1
+                continue
+            body = await response.json()
+        results["latency"].append(time.perf_counter() - start)
+        results["sources"][body["source"]] = results["sources"].get(body["source"], 0) + 1
+        session_id = body["session_id"]
+
+
+async def ws_user(session, url, user, turns, repeat, results):
+    async with session.ws_connect(f"{url}/ws") as socket:
+        await socket.receive_json()
+        for turn in range(turns):
+            start = time.perf_counter()
+            first_token = None
+            await socket.send_json({"message": question_for(user, turn, repeat)})
+            while True:
+                event = await socket.receive_json()
+                if event["type"] == "delta" and first_token is None:
+                    first_token = time.perf_counter() - start
+                elif event["type"] == "done":
+                    results["latency"].append(time.perf_counter() - start)
+                    results["sources"][event["source"]] = results["sources"].get(event["source"], 0) + 1
+                    if first_token is not None:
+                        results["first_token"].append(first_token)
+                    break
+                elif event["type"] == "error":
+                    results["errors"] += 1
+                    break
+
+
+async def run(users, turns, url, use_ws, repeat):
+    results = {"latency": [], "first_token": [], "sources": {}, "errors": 0}
+    user_fn = ws_user if use_ws else http_user
+
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(user_fn(session, url, user, turns, repeat, results) for user in range(users)))
+        elapsed = time.perf_counter() - start
+
+    return results, elapsed
+
+
+def main():
+    flags = [arg for arg in sys.argv[1:] if arg.startswith("--")]
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    users = int(args[0]) if len(args) > 0 else 50
+    turns = int(args[1]) if len(args) > 1 else 5
+    url = next((flag.split("=", 1)[1] for flag in flags if flag.startswith("--url=")), "http://127.0.0.1:8080")
+
+    results, elapsed = asyncio.run(run(users, turns, url.rstrip("/"), "--ws" in flags, "--repeat" in flags))
+
+    latency = results["latency"]
+    transport = "WebSocket" if "--ws" in flags else "HTTP"
+    print(f"{users} users x {turns} turns over {transport}: {len(latency)} replies, {results['errors']} errors "
+          f"in {elapsed:.2f}s ({len(latency) / elapsed:.1f} turns/s)")
+    for label, samples in (("turn", latency), ("first token", results["first_token"])):
+        if samples:
+            print(f"  {label:<12} mean {statistics.mean(samples) * 1000:8.1f} ms   "
+                  f"p50 {percentile(samples, 0.5) * 1000:8.1f} ms   p90 {percentile(samples, 0.9) * 1000:8.1f} ms   "
+                  f"p99 {percentile(samples, 0.99) * 1000:8.1f} ms")
+    print(f"  sources      {results['sources']}")
+
+
+if __name__ == "__main__":
+    main()
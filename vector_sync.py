@@ -0,0 +1,262 @@
+"""
+Module Name: vector_sync.py
+Description: This module keeps the OpenAI vector store in sync with the data folder. A manifest on disk remembers the
+             vector store id plus the content hash and file id of every uploaded data file, so a restart reuses the
+             store and only uploads what changed. Uploads run in parallel and are indexed in batches as they finish.
+Author: Nathaniel Thoma
+Date: 2026-10-18
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+import hashlib
+import time
+import json
+import os
+from openai import NotFoundError
+import metrics
+
+class VectorStoreSync():
+
+    # Data files file_search accepts: the extracted JSON files and the exported Markdown chunks
+    # (jsonl outputs aren't accepted, ExportChunks turns them into Markdown chunks that are)
+    SUPPORTED_SUFFIXES = (".json", ".md")
+
+    # -----------------------------------------------------------------------------------------------------------------
+    # Private Methods
+    # -----------------------------------------------------------------------------------------------------------------
+
+    def __init__(self, client, manifest_path, upload_workers=4, index_batch_size=4):
+        self.client = client
+        self.manifest_path = Path(manifest_path)
+        self.upload_workers = max(1, upload_workers)
+        self.index_batch_size = max(1, index_batch_size)
+
+        # Seconds between indexing status checks, doubling up to the max
+        self.poll_interval = 0.5
+        self.max_poll_interval = 8
+
+        # manifest["files"] = {file name: {"hash": sha256 of the contents, "file_id": OpenAI file id}}
+        self.manifest = {"vector_store_id": None, "files": {}}
+        if self.manifest_path.exists():
+            with open(self.manifest_path, 'r') as f:
+                self.manifest = json.load(f)
+
+    def _save_manifest(self):
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=4)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _hash_file(self, file_path):
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    # Reuse the store from the manifest if it still exists, otherwise start a fresh one
+    def _get_vector_store(self, store_name):
+        vector_store_id = self.manifest.get("vector_store_id")
+        if vector_store_id:
+            try:
+                return self.client.vector_stores.retrieve(vector_store_id)
+            except NotFoundError:
+                print(f"Vector store {vector_store_id} no longer exists, creating a new one")
+
+        vector_store = self.client.vector_stores.create(name=store_name)
+        self.manifest = {"vector_store_id": vector_store.id, "files": {}}
+        self._save_manifest()
+        return vector_store
+
+    # Detach a file from the store and delete it from OpenAI (it may already be gone)
+    def _remove_file(self, vector_store_id, file_id):
+        try:
+            self.client.vector_stores.files.delete(file_id=file_id, vector_store_id=vector_store_id)
+        except NotFoundError:
+            pass
+        try:
+            self.client.files.delete(file_id)
+        except NotFoundError:
+            pass
+
+    # Upload one file to OpenAI, returns (file name, file id, seconds taken)
+    def _upload_one(self, file_path):
+        start = time.perf_counter()
+        with metrics.span("upload", file=file_path.name, bytes=file_path.stat().st_size):
+            with open(file_path, "rb") as f:
+                uploaded_file = self.client.files.create(
+                    file=f,
+                    purpose="assistants"
+                )
+        return file_path.name, uploaded_file.id, time.perf_counter() - start
+
+    # Start indexing a group of uploaded files without waiting for it to finish
+    def _start_batch(self, vector_store_id, uploaded):
+        file_batch = self.client.vector_stores.file_batches.create(
+            vector_store_id=vector_store_id,
+            file_ids=list(uploaded.values())
+        )
+        print(f"Indexing {len(uploaded)} files into the Vector Store...")
+        return {"batch": file_batch, "files": dict(uploaded), "started": time.perf_counter()}
+
+    # Poll every batch until it is done, waiting a little longer between each round
+    def _wait_for_batches(self, vector_store_id, batches):
+        delay = self.poll_interval
+        pending = [batch for batch in batches if batch["batch"].status == "in_progress"]
+        for batch in batches:
+            if batch not in pending:
+                batch["finished"] = time.perf_counter()
+
+        with metrics.span("index_poll", batches=len(batches), files=sum(len(b["files"]) for b in batches)) as span:
+            while pending:
+                time.sleep(delay)
+                delay = min(delay * 2, self.max_poll_interval)
+
+                for batch in list(pending):
+                    span.add("polls")
+                    batch["batch"] = self.client.vector_stores.file_batches.retrieve(
+                        batch["batch"].id,
+                        vector_store_id=vector_store_id
+                    )
+                    if batch["batch"].status != "in_progress":
+                        batch["finished"] = time.perf_counter()
+                        pending.remove(batch)
+
+    # Start indexing a group of uploaded files, if that fails the files are deleted again so none are left behind
+    # Returns the batch, or None (the error is added to errors and the files are dropped from uploaded)
+    def _start_batch_or_drop(self, vector_store_id, waiting, uploaded, errors):
+        try:
+            return self._start_batch(vector_store_id, waiting)
+        except Exception as error:
+            print(f"Could not start indexing {', '.join(waiting)}: {error}")
+            errors.append(error)
+            for file_name, file_id in waiting.items():
+                del uploaded[file_name]
+                try:
+                    self.client.files.delete(file_id)
+                except NotFoundError:
+                    pass
+            return None
+
+    # Upload files in parallel and index them into the store as they finish uploading
+    # A file that fails doesn't stop the others, returns ({file name: file id} for the ones that indexed, errors)
+    def _upload_files(self, vector_store_id, file_paths):
+        upload_times = {}
+        uploaded = {}
+        batches = []
+        waiting = {}
+        errors = []
+
+        with ThreadPoolExecutor(max_workers=self.upload_workers) as pool:
+            uploads = {
+                pool.submit(metrics.bind_context(self._upload_one), file_path): file_path for file_path in file_paths
+            }
+
+            # Hand finished uploads to the indexer in groups, while the rest are still uploading
+            for upload in as_completed(uploads):
+                try:
+                    file_name, file_id, seconds = upload.result()
+                except Exception as error:
+                    print(f"Upload failed for {uploads[upload].name}: {error}")
+                    errors.append(error)
+                    continue
+
+                print(f"Uploaded: {file_name} ({seconds:.2f}s)")
+                upload_times[file_name] = seconds
+                uploaded[file_name] = file_id
+                waiting[file_name] = file_id
+
+                if len(waiting) >= self.index_batch_size:
+                    batches.append(self._start_batch_or_drop(vector_store_id, waiting, uploaded, errors))
+                    waiting = {}
+
+        if waiting:
+            batches.append(self._start_batch_or_drop(vector_store_id, waiting, uploaded, errors))
+        batches = [batch for batch in batches if batch is not None]
+
+        # The files are in the store by now, if we can't find out how indexing went they are kept (and recorded in the
+        # manifest) rather than uploaded again as duplicates next run
+        try:
+            self._wait_for_batches(vector_store_id, batches)
+        except Exception as error:
+            print(f"Could not check on indexing: {error}")
+            errors.append(error)
+            return uploaded, errors
+
+        print("Upload and indexing latency:")
+        for batch in batches:
+            index_time = batch["finished"] - batch["started"]
+            for file_name in batch["files"]:
+                print(f"  {file_name:<40} upload {upload_times[file_name]:6.2f}s   index {index_time:6.2f}s")
+
+        # Files that failed to index are dropped, so they get uploaded again on the next run
+        for batch in batches:
+            file_batch = batch["batch"]
+            if file_batch.file_counts.completed == len(batch["files"]):
+                continue
+
+            print(f"Batch {file_batch.id} finished as {file_batch.status}, "
+                  f"{file_batch.file_counts.completed}/{len(batch['files'])} files indexed")
+            indexed_files = self.client.vector_stores.file_batches.list_files(
+                file_batch.id,
+                vector_store_id=vector_store_id,
+                filter="completed"
+            )
+            indexed_ids = {file.id for file in indexed_files}
+            for file_name, file_id in batch["files"].items():
+                if file_id not in indexed_ids:
+                    print(f"Indexing failed for {file_name}")
+                    self._remove_file(vector_store_id, file_id)
+                    del uploaded[file_name]
+
+        return uploaded, errors
+
+    # -----------------------------------------------------------------------------------------------------------------
+    # Public Methods
+    # -----------------------------------------------------------------------------------------------------------------
+
+    # Bring the vector store up to date with data_dir, returns the vector store id
+    def sync(self, data_dir, store_name="Project Knowledge Base"):
+        vector_store = self._get_vector_store(store_name)
+        known_files = self.manifest["files"]
+
+        current_files = {
+            file_path.name: file_path for file_path in sorted(Path(data_dir).glob("*"))
+            if file_path.is_file() and file_path.suffix in self.SUPPORTED_SUFFIXES
+        }
+
+        # Unfinished .tmp files are left alone quietly, anything else that can't be uploaded gets mentioned
+        for file_path in sorted(Path(data_dir).glob("*")):
+            if file_path.is_file() and file_path.suffix not in self.SUPPORTED_SUFFIXES + (".tmp",):
+                print(f"Not uploading {file_path.name}, file_search doesn't accept {file_path.suffix} files")
+        current_hashes = {file_name: self._hash_file(file_path) for file_name, file_path in current_files.items()}
+
+        changed = [
+            file_path for file_name, file_path in current_files.items()
+            if known_files.get(file_name, {}).get("hash") != current_hashes[file_name]
+        ]
+        removed = [file_name for file_name in known_files if file_name not in current_files]
+
+        if not changed and not removed:
+            print(f"Vector store is up to date ({len(known_files)} files)")
+            return vector_store.id
+
+        # Upload new and changed files first, so the store is never missing data while the old copies go away
+        # Files that failed keep their old copy and are tried again next run
+        uploaded, errors = self._upload_files(vector_store.id, changed)
+        replaced = [file_name for file_name in uploaded if file_name in known_files]
+
+        for file_name in removed + replaced:
+            entry = known_files.pop(file_name)
+            print(f"Removing old copy of {file_name}...")
+            self._remove_file(vector_store.id, entry["file_id"])
+
+        for file_name, file_id in uploaded.items():
+            known_files[file_name] = {"hash": current_hashes[file_name], "file_id": file_id}
+
+        # Everything that made it into the store is in the manifest before a failure is passed on
+        self._save_manifest()
+        if errors:
+            raise errors[0]
+        return vector_store.id
@@ -0,0 +1,413 @@
+"""
+Module Name: wiki_database.py
+Description: This module provides the SQLite storage backend for the extracted wiki data (OutputFormat "sqlite").
+             Every ghost, piece of equipment and single-page data file becomes an entity row, the sections built by
+             GeneralParser.parse_wiki_hierarchy become section rows, ghost evidence gets its own indexed table and
+             section text is searchable through an FTS5 index. Entities are upserted by page revision, so a refresh
+             only rewrites what changed, and the original JSON data files can be exported again at any time.
+Author: Nathaniel Thoma
+Date: 2026-10-18
+"""
+
+from pathlib import Path
+import threading
+import hashlib
+import sqlite3
+import time
+import json
+import uuid
+import re
+from data_folder import ENTITY_KEYS, content_to_text
+import metrics
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outputs (
+    source TEXT PRIMARY KEY,
+    shape TEXT NOT NULL,
+    group_key TEXT,
+    groups TEXT
+);
+CREATE TABLE IF NOT EXISTS entities (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    category TEXT NOT NULL DEFAULT '',
+    name TEXT NOT NULL,
+    occurrence INTEGER NOT NULL DEFAULT 1,
+    position INTEGER NOT NULL,
+    page TEXT,
+    revid INTEGER,
+    digest TEXT NOT NULL,
+    fields TEXT NOT NULL,
+    run TEXT NOT NULL,
+    updated REAL NOT NULL,
+    UNIQUE (source, category, name, occurrence)
+);
+CREATE INDEX IF NOT EXISTS entities_name ON entities (name);
+CREATE TABLE IF NOT EXISTS sections (
+    id INTEGER PRIMARY KEY,
+    entity_id INTEGER NOT NULL REFERENCES entities (id),
+    parent_id INTEGER REFERENCES sections (id),
+    position INTEGER NOT NULL,
+    level INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    title_tables TEXT,
+    text TEXT NOT NULL,
+    tables TEXT
+);
+CREATE INDEX IF NOT EXISTS sections_entity ON sections (entity_id, position);
+CREATE INDEX IF NOT EXISTS sections_title ON sections (title);
+CREATE TABLE IF NOT EXISTS evidence (
+    entity_id INTEGER NOT NULL REFERENCES entities (id),
+    evidence TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS evidence_type ON evidence (evidence, entity_id);
+CREATE INDEX IF NOT EXISTS evidence_entity ON evidence (entity_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS sections_fts USING fts5 (title, body);
+"""
+
+class WikiDatabase():
+
+    # Words of a search query, each one is matched as a quoted FTS5 string so punctuation can't break the syntax
+    word_pattern = re.compile(r"\w+")
+
+    # -----------------------------------------------------------------------------------------------------------------
+    # Private Methods
+    # -----------------------------------------------------------------------------------------------------------------
+
+    def __init__(self, db_path, revisions=None):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # revisions(page title) -> revision id the page was fetched at, or None when it isn't known
+        self.revisions = revisions
+
+        # Extractors write from several threads, they take turns on the one connection
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self.db.commit()
+
+        # Data files whose stored items changed since this database was opened, only those need exporting again
+        self.changed_sources = set()
+
+    # Split a title or content (plain text, or {"text", "tables"}) into its text and its tables as JSON (or None)
+    def _split_content(self, content):
+        if isinstance(content, str):
+            return content, None
+        return content.get("text", ""), json.dumps(content.get("tables", []))
+
+    def _join_content(self, text, tables):
+        if tables is None:
+            return text
+        return {"text": text, "tables": json.loads(tables)}
+
+    # Insert a section tree depth first (call with the lock held)
+    def _insert_sections(self, entity_id, section, parent_id=None, position=0):
+        title, title_tables = self._split_content(section["title"])
+        text, tables = self._split_content(section["content"])
+        cursor = self.db.execute(
+            "INSERT INTO sections (entity_id, parent_id, position, level, title, title_tables, text, tables) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (entity_id, parent_id, position, section["level"], title, title_tables, text, tables)
+        )
+        section_id = cursor.lastrowid
+        self.db.execute(
+            "INSERT INTO sections_fts (rowid, title, body) VALUES (?, ?, ?)",
+            (section_id, title, content_to_text(section["content"]))
+        )
+
+        position += 1
+        for subsection in section["subsections"]:
+            position = self._insert_sections(entity_id, subsection, section_id, position)
+        return position
+
+    # Drop everything stored under entities (call with the lock held)
+    def _delete_children(self, entity_ids):
+        for entity_id in entity_ids:
+            self.db.execute(
+                "DELETE FROM sections_fts WHERE rowid IN (SELECT id FROM sections WHERE entity_id = ?)", (entity_id,)
+            )
+            self.db.execute("DELETE FROM sections WHERE entity_id = ?", (entity_id,))
+            self.db.execute("DELETE FROM evidence WHERE entity_id = ?", (entity_id,))
+
+    # Rebuild a section tree from its rows
+    def _load_sections(self, entity_id):
+        rows = self.db.execute(
+            "SELECT id, parent_id, level, title, title_tables, text, tables FROM sections "
+            "WHERE entity_id = ? ORDER BY position",
+            (entity_id,)
+        ).fetchall()
+
+        nodes = {}
+        root = None
+        for section_id, parent_id, level, title, title_tables, text, tables in rows:
+            node = {
+                "title": self._join_content(title, title_tables),
+                "level": level,
+                "content": self._join_content(text, tables),
+                "subsections": []
+            }
+            nodes[section_id] = node
+            if parent_id is None:
+                root = node
+            else:
+                nodes[parent_id]["subsections"].append(node)
+        return root
+
+    # The item an entity was written from
+    def _load_item(self, entity_id, fields):
+        item = json.loads(fields)
+        if "Wiki Content" in item:
+            item["Wiki Content"] = self._load_sections(entity_id)
+        return item
+
+    # -----------------------------------------------------------------------------------------------------------------
+    # Public Methods
+    # -----------------------------------------------------------------------------------------------------------------
+
+    # Remember how a data file is shaped, so it can be exported the same way
+    def set_output(self, source, shape, group_key=None, groups=None):
+        groups = json.dumps(groups) if groups is not None else None
+        with self.lock:
+            if self.db.execute(
+                "SELECT shape, group_key, groups FROM outputs WHERE source = ?", (source,)
+            ).fetchone() != (shape, group_key, groups):
+                self.changed_sources.add(source)
+            self.db.execute(
+                "INSERT INTO outputs (source, shape, group_key, groups) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(source) DO UPDATE SET shape = excluded.shape, group_key = excluded.group_key, "
+                "groups = excluded.groups",
+                (source, shape, group_key, groups)
+            )
+            self.db.commit()
+
+    # Insert or update one item of a data file, returns True if it had to be (re)written
+    # An item whose page revision and contents are the same as last time only gets its position updated
+    def upsert(self, source, item, position, run, category="", occurrence=1, page=None):
+        name = next((item[key] for key in ENTITY_KEYS if key in item), page or source)
+        page = page or name
+        revid = self.revisions(page) if self.revisions else None
+
+        fields = json.dumps({key: (None if key == "Wiki Content" else value) for key, value in item.items()})
+        digest = hashlib.sha256(json.dumps(item, sort_keys=True).encode("utf-8")).hexdigest()
+
+        with self.lock:
+            row = self.db.execute(
+                "SELECT id, revid, digest, position FROM entities "
+                "WHERE source = ? AND category = ? AND name = ? AND occurrence = ?",
+                (source, category, name, occurrence)
+            ).fetchone()
+
+            if row is not None and row[1] == revid and row[2] == digest:
+                if row[3] != position:
+                    self.changed_sources.add(source)
+                self.db.execute("UPDATE entities SET position = ?, run = ? WHERE id = ?", (position, run, row[0]))
+                self.db.commit()
+                return False
+
+            self.changed_sources.add(source)
+            if row is None:
+                cursor = self.db.execute(
+                    "INSERT INTO entities "
+                    "(source, category, name, occurrence, position, page, revid, digest, fields, run, updated) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (source, category, name, occurrence, position, page, revid, digest, fields, run, time.time())
+                )
+                entity_id = cursor.lastrowid
+            else:
+                entity_id = row[0]
+                self._delete_children([entity_id])
+                self.db.execute(
+                    "UPDATE entities SET position = ?, page = ?, revid = ?, digest = ?, fields = ?, run = ?, "
+                    "updated = ? WHERE id = ?",
+                    (position, page, revid, digest, fields, run, time.time(), entity_id)
+                )
+
+            if isinstance(item.get("Wiki Content"), dict):
+                self._insert_sections(entity_id, item["Wiki Content"])
+
+            summary = item.get("Ghost Summary")
+            evidence = summary.get("Evidence", []) if isinstance(summary, dict) else []
+            self.db.executemany(
+                "INSERT INTO evidence (entity_id, evidence) VALUES (?, ?)",
+                [(entity_id, evidence_type) for evidence_type in evidence]
+            )
+
+            self.db.commit()
+            return True
+
+    # Drop the items of a data file that weren't written in its latest run (e.g. a ghost removed from the wiki)
+    def remove_stale(self, source, run):
+        with self.lock:
+            stale_ids = [row[0] for row in self.db.execute(
+                "SELECT id FROM entities WHERE source = ? AND run != ?", (source, run)
+            )]
+            self._delete_children(stale_ids)
+            self.db.executemany("DELETE FROM entities WHERE id = ?", [(entity_id,) for entity_id in stale_ids])
+            self.db.commit()
+            if stale_ids:
+                self.changed_sources.add(source)
+            return len(stale_ids)
+
+    # A writer for a multi-item data file, used like the JSON writers
+    def writer(self, file_stem, group_key=None):
+        return DatabaseWriter(self, file_stem, group_key)
+
+    # Store a single-item data file (one page's data)
+    def write_single(self, file_stem, data, page=None):
+        run = uuid.uuid4().hex
+        with metrics.span("write", file=file_stem, items=1, backend="sqlite") as span:
+            self.set_output(file_stem, "single")
+            span.set("rewritten", int(self.upsert(file_stem, data, 0, run, page=page)))
+            self.remove_stale(file_stem, run)
+
+    # Every item stored for a data file (or under a name), as it was written
+    def get_items(self, source=None, name=None):
+        query = "SELECT id, fields FROM entities WHERE 1 = 1"
+        params = []
+        if source is not None:
+            query += " AND source = ?"
+            params.append(source)
+        if name is not None:
+            query += " AND name = ?"
+            params.append(name)
+
+        with self.lock:
+            rows = self.db.execute(query + " ORDER BY source, position", params).fetchall()
+            return [self._load_item(entity_id, fields) for entity_id, fields in rows]
+
+    # Names of the ghosts that show every one of the given evidence types
+    def ghosts_with_evidence(self, evidence_types):
+        evidence_types = list(dict.fromkeys(evidence_types))
+        placeholders = ", ".join("?" for _ in evidence_types)
+        with self.lock:
+            rows = self.db.execute(
+                f"SELECT entities.name FROM evidence JOIN entities ON entities.id = evidence.entity_id "
+                f"WHERE evidence.evidence IN ({placeholders}) "
+                f"GROUP BY entities.id HAVING COUNT(DISTINCT evidence.evidence) = ? ORDER BY entities.position",
+                evidence_types + [len(evidence_types)]
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    # Full text search over section titles and text, best matches first
+    # The query is taken as plain words ("banshee's evidence?", "EMF-5"), sections with any of them match and bm25
+    # ranks the ones with the most (and rarest) of them first
+    def search_sections(self, query, limit=5):
+        words = WikiDatabase.word_pattern.findall(query)
+        if not words:
+            return []
+        match = " OR ".join('"' + word.replace('"', '""') + '"' for word in words)
+
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT entities.source, entities.name, sections.title, sections_fts.body, bm25(sections_fts) "
+                "FROM sections_fts JOIN sections ON sections.id = sections_fts.rowid "
+                "JOIN entities ON entities.id = sections.entity_id "
+                "WHERE sections_fts MATCH ? ORDER BY bm25(sections_fts) LIMIT ?",
+                (match, limit)
+            ).fetchall()
+        return [
+            {"source": source, "entity": name, "title": title, "text": body, "score": -score}
+            for source, name, title, body, score in rows
+        ]
+
+    # Write the stored data files back out as JSON, the same files the JSON backend writes
+    # With changed_only, files that are already there and whose items didn't change since opening are left alone
+    def export_json(self, output_dir, changed_only=False):
+        from output_writer import JsonWriter, save_json
+
+        with self.lock:
+            outputs = self.db.execute("SELECT source, shape, group_key, groups FROM outputs ORDER BY source").fetchall()
+
+        for source, shape, group_key, groups in outputs:
+            if changed_only and source not in self.changed_sources and (Path(output_dir) / f"{source}.json").exists():
+                continue
+
+            with self.lock:
+                rows = self.db.execute(
+                    "SELECT id, category, fields FROM entities WHERE source = ? ORDER BY position", (source,)
+                ).fetchall()
+                items = [(category, self._load_item(entity_id, fields)) for entity_id, category, fields in rows]
+
+            if shape == "single":
+                if items:
+                    save_json(output_dir, f"{source}.json", items[0][1])
+                continue
+
+            with JsonWriter(output_dir, source, group_key) as json_writer:
+                for group in json.loads(groups) if groups else []:
+                    json_writer.add_group(group)
+                for category, item in items:
+                    json_writer.write(item, group=category or None)
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+class DatabaseWriter():
+
+    def __init__(self, database, file_stem, group_key=None):
+        self.database = database
+        self.source = file_stem
+        self.group_key = group_key
+        self.path = database.db_path
+        self.count = 0
+        self.rewritten = 0
+
+        # Items written in this run are marked with it, anything else left for this file afterwards is stale
+        self.run = uuid.uuid4().hex
+
+        # Groups in the order they were declared or first written to, and how often each name came up in each group
+        self.groups = []
+        self.occurrences = {}
+        self.write_s = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, error_type, error, traceback):
+        if error_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    # Upsert an item, grouped under group if given
+    def write(self, item, group=None):
+        start = time.perf_counter()
+        if group is not None:
+            self.add_group(group)
+
+        key = (group or "", next((item[key] for key in ENTITY_KEYS if key in item), self.source))
+        self.occurrences[key] = self.occurrences.get(key, 0) + 1
+
+        rewritten = self.database.upsert(
+            self.source, item, self.count, self.run,
+            category=group or "", occurrence=self.occurrences[key]
+        )
+        self.rewritten += int(rewritten)
+        self.count += 1
+        self.write_s += time.perf_counter() - start
+
+    # Declare a group up front, so it is exported even if it ends up empty
+    def add_group(self, group):
+        if group not in self.groups:
+            self.groups.append(group)
+
+    def close(self):
+        start = time.perf_counter()
+        shape = "groups" if self.groups else "list"
+        self.database.set_output(self.source, shape, self.group_key, self.groups if self.groups else None)
+        removed = self.database.remove_stale(self.source, self.run)
+        self.write_s += time.perf_counter() - start
+        metrics.record(
+            "write", self.write_s, file=self.source, items=self.count, rewritten=self.rewritten, removed=removed,
+            backend="sqlite"
+        )
+
+    # Items written so far are already stored, only the stale ones are kept until a run gets to the end
+    def abort(self):
+        print(f"Stored {self.count} records written before the failure in '{self.path.name}'")
@@ -0,0 +1,204 @@
+"""
+Module Name: wiki_fetcher.py
+Description: This module provides a fetch layer for pulling raw page wikitext from the MediaWiki API in batches,
+             over a shared keep-alive session with bounded concurrency and an optional revision-aware cache.
+Author: Nathaniel Thoma
+Date: 2026-10-18
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from page_cache import PageCache
+from fetch_policy import FetchPolicy
+import metrics
+
+# Shared fetchers, one per wiki URL, so every extractor reuses the same connection pool
+_fetchers = {}
+_fetchers_lock = threading.Lock()
+
+class WikiFetcher():
+
+    # Maximum number of titles the MediaWiki API accepts in a single query (non-bot accounts)
+    MAX_TITLES_PER_QUERY = 50
+
+    # -----------------------------------------------------------------------------------------------------------------
+    # Private Methods
+    # -----------------------------------------------------------------------------------------------------------------
+
+    def __init__(self, url, max_workers=8, cache_dir=None, offline=False, max_retries=5, timeout=30, maxlag=5):
+        self.url = url
+        self.max_workers = max_workers
+
+        # Timeouts, retries with backoff, and a limit on requests in flight that adapts to throttling
+        self.policy = FetchPolicy(max_concurrency=max_workers, max_retries=max_retries, timeout=timeout, maxlag=maxlag)
+
+        # Optional revision-aware cache of raw wikitext, offline mode serves everything from it
+        self.cache = PageCache(cache_dir) if cache_dir else None
+        self.offline = offline
+        if offline and self.cache is None:
+            raise ValueError("Offline mode needs a cache directory to read pages from")
+
+        # Revision id of the page each requested title was last served from, {requested title: revid}
+        self.revisions = {}
+
+        # Keep-alive session with enough pooled connections for every worker
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    # Run one revisions query for up to MAX_TITLES_PER_QUERY titles, following any continuation
+    # Returns ({page title: {"revid": ..., "content": ...}}, {requested title: rewritten title})
+    def _query_batch(self, titles, with_content=True):
+        params = {
+            "action": "query",
+            "titles": "|".join(titles),
+            "prop": "revisions",
+            "rvprop": "ids|content" if with_content else "ids",
+            "rvslots": "main",
+            "redirects": 1,
+            "formatversion": 2,
+            "format": "json",
+            "origin": "*"
+        }
+
+        pages = {}
+        aliases = {}
+        with metrics.span("fetch", pages=len(titles), content=with_content) as span:
+            while True:
+                response, res = self.policy.get(self.session, self.url, params)
+                span.add("requests")
+                span.add("bytes", len(response.content))
+                query = res.get("query", {})
+
+                # Titles the API rewrote (e.g. "banshee" -> "Banshee", or a redirect to its target)
+                for entry in query.get("normalized", []) + query.get("redirects", []):
+                    aliases[entry["from"]] = entry["to"]
+
+                for page in query.get("pages", []):
+                    if "revisions" in page:
+                        revision = page["revisions"][0]
+                        pages[page["title"]] = {
+                            "revid": revision["revid"],
+                            "content": revision["slots"]["main"]["content"] if with_content else None
+                        }
+
+                # Large batches get split across several responses
+                if "continue" not in res:
+                    break
+                params = {**params, **res["continue"]}
+
+        return pages, aliases
+
+    # Query every title in batches, running the batches in parallel
+    def _query_all(self, titles, with_content=True):
+        batches = [
+            titles[i:i + self.MAX_TITLES_PER_QUERY]
+            for i in range(0, len(titles), self.MAX_TITLES_PER_QUERY)
+        ]
+
+        # Results are merged in batch order so the output stays deterministic
+        if len(batches) > 1:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as pool:
+                futures = [
+                    pool.submit(metrics.bind_context(self._query_batch), batch, with_content) for batch in batches
+                ]
+                results = [future.result() for future in futures]
+        else:
+            results = [self._query_batch(batch, with_content) for batch in batches]
+
+        pages = {}
+        aliases = {}
+        for batch_pages, batch_aliases in results:
+            pages.update(batch_pages)
+            aliases.update(batch_aliases)
+
+        return pages, aliases
+
+    # Serve pages only from the cache, without touching the network
+    def _fetch_offline(self, titles):
+        for title in titles:
+            self.revisions[title] = self.cache.get_revid(self.cache.resolve(title))
+        return {title: self.cache.get(self.cache.resolve(title)) for title in titles}
+
+    # Ask for revision ids first (cheap), then only download pages whose revision moved since they were cached
+    def _fetch_cached(self, titles):
+        revisions, aliases = self._query_all(titles, with_content=False)
+
+        stale_titles = [
+            page_title for page_title, revision in revisions.items()
+            if not self.cache.has(page_title, revision["revid"])
+        ]
+        if stale_titles:
+            fresh_pages, _ = self._query_all(stale_titles)
+            for page_title, page in fresh_pages.items():
+                self.cache.put(page_title, page["revid"], page["content"])
+
+        contents = {}
+        for title in titles:
+            page_title = self._resolve_title(title, aliases)
+            self.cache.add_alias(title, page_title)
+            contents[title] = self.cache.get(page_title) if page_title in revisions else None
+            self.revisions[title] = revisions[page_title]["revid"] if page_title in revisions else None
+
+        self.cache.save()
+        return contents
+
+    # Follow normalization and redirect entries until we land on a real page title
+    def _resolve_title(self, title, aliases):
+        seen = set()
+        while title in aliases and title not in seen:
+            seen.add(title)
+            title = aliases[title]
+        return title
+
+    # -----------------------------------------------------------------------------------------------------------------
+    # Public Methods
+    # -----------------------------------------------------------------------------------------------------------------
+
+    # Fetch many pages at once, returns {requested title: wikitext or None if the page is missing}
+    def fetch_pages(self, titles):
+        unique_titles = list(dict.fromkeys(titles))
+
+        if self.offline:
+            return self._fetch_offline(unique_titles)
+        if self.cache is not None:
+            return self._fetch_cached(unique_titles)
+
+        pages, aliases = self._query_all(unique_titles)
+        contents = {}
+        for title in unique_titles:
+            page = pages.get(self._resolve_title(title, aliases))
+            contents[title] = page["content"] if page else None
+            self.revisions[title] = page["revid"] if page else None
+
+        return contents
+
+    # Fetch a single page, raises KeyError if the page does not exist
+    def fetch_page(self, title):
+        content = self.fetch_pages([title])[title]
+        if content is None:
+            raise KeyError(f"Page '{title}' does not exist on {self.url}")
+        return content
+
+    # Revision id of the page a title was last fetched from, or None if it hasn't been fetched (or doesn't exist)
+    def revision(self, title):
+        return self.revisions.get(title)
+
+
+# Get the shared fetcher for a wiki, creating it on first use (options only apply when it gets created)
+def get_fetcher(url, **options):
+    with _fetchers_lock:
+        fetcher = _fetchers.get(url)
+        if fetcher is None:
+            fetcher = WikiFetcher(url, **options)
+            _fetchers[url] = fetcher
+        return fetcher
+
+
+# Serve a wiki from something other than its API (e.g. a DumpFetcher), every get_fetcher(url) gets it from now on
+def register_fetcher(url, fetcher):
+    with _fetchers_lock:
+        _fetchers[url] = fetcher